@@ -0,0 +1,8 @@
+"""Aether3D server application package."""
+
+import sys
+
+# Minimum Python: app/pipelines/nerfstudio.py uses asyncio.TaskGroup and except*.
+# Checked here so an older interpreter fails with this message instead of a SyntaxError.
+if sys.version_info < (3, 11):
+    raise RuntimeError("Aether3D server requires Python 3.11+")
@@ -4,11 +4,13 @@
 
 """API合约Schema定义（Pydantic v2）"""
 
+import hashlib
+import json
 from datetime import datetime
 from enum import Enum
 from typing import Generic, List, Optional, TypeVar, Union
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 # GATE-1: Pydantic v2配置
 PydanticConfig = ConfigDict(extra="forbid")  # 禁止未知字段
@@ -59,6 +61,29 @@ class APIResponse(BaseModel, Generic[T]):
     model_config = PydanticConfig
 
 
+def render_error_envelope(
+    code: APIErrorCode, message: str, details: Optional[dict[str, DetailValue]] = None
+) -> bytes:
+    """
+    错误信封直接渲染为JSON bytes（固定错误在import时预构建一次）
+    
+    与JSONResponse(content=APIResponse(...).model_dump(exclude_none=True)).body逐字节一致
+    （紧凑分隔符、UTF-8、不转义非ASCII），由pydantic-core序列化，不经stdlib json。
+    """
+    error_response = APIResponse(success=False, error=APIError(code=code, message=message, details=details))
+    return error_response.model_dump_json(exclude_none=True).encode("utf-8")
+
+
+def render_success_envelope(data: dict) -> bytes:
+    """
+    成功信封直接渲染为JSON bytes（热路径：任务状态轮询/列表）
+    
+    与JSONResponse(content=APIResponse(success=True, data=data).model_dump(exclude_none=True)).body
+    逐字节一致，但跳过中间dict物化和stdlib json.dumps。
+    """
+    return APIResponse(success=True, data=data).model_dump_json(exclude_none=True).encode("utf-8")
+
+
 # MARK: - Device Info
 
 class DeviceInfo(BaseModel):
@@ -189,6 +214,10 @@ class JobListItem(BaseModel):
     model_config = PydanticConfig
 
 
+# 任务列表行序列化器：import时构建一次，list_jobs每次请求只调用dump_python
+JOB_LIST_ITEMS_ADAPTER: TypeAdapter[List[JobListItem]] = TypeAdapter(List[JobListItem])
+
+
 class ListJobsResponse(BaseModel):
     """查询任务列表响应"""
     jobs: List[JobListItem]
@@ -267,24 +296,31 @@ class HealthResponse(BaseModel):
 
 # MARK: - Canonical JSON Hash (PATCH-7)
 
-def compute_payload_hash(payload: dict) -> str:
+def compute_payload_digest(payload: dict) -> bytes:
     """
-    计算payload的canonical JSON hash（PATCH-7：与Swift完全一致）
+    计算payload的canonical JSON SHA-256原始digest（32字节）
     
-    Python canonicalization:
-    json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
-    sha256(utf8_bytes)
+    与compute_payload_hash()同一canonical形式；幂等缓存直接保存/比较digest，
+    不生成64字符hex。
     """
-    import hashlib
-    import json
-    
     canonical = json.dumps(
         payload,
         sort_keys=True,
         separators=(',', ':'),
         ensure_ascii=False
     )
-    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    return hashlib.sha256(canonical.encode('utf-8')).digest()
+
+
+def compute_payload_hash(payload: dict) -> str:
+    """
+    计算payload的canonical JSON hash（PATCH-7：与Swift完全一致）
+    
+    Python canonicalization:
+    json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    sha256(utf8_bytes)
+    """
+    return compute_payload_digest(payload).hex()
 
 
 # MARK: - Timestamp Format (GATE-4)
@@ -296,7 +332,9 @@ def format_rfc3339_utc(dt: datetime) -> str:
     格式: YYYY-MM-DDTHH:MM:SSZ
     无毫秒，无微秒
     """
-    # 移除微秒
-    dt = dt.replace(microsecond=0)
-    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    # isoformat(timespec="seconds")截断微秒；比strftime快（无格式串解析）
+    # 与原strftime一致：aware输入只取其字段，不追加偏移量
+    if dt.tzinfo is not None:
+        dt = dt.replace(tzinfo=None)
+    return dt.isoformat(timespec="seconds") + "Z"
 
@@ -9,14 +9,14 @@ from datetime import datetime
 from typing import List, Optional
 
 from fastapi import Depends, Query, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
 
 from app.api.contract import (
-    APIError, APIErrorCode, APIResponse, CancelJobRequest,
+    JOB_LIST_ITEMS_ADAPTER, APIError, APIErrorCode, APIResponse, CancelJobRequest,
     CancelJobResponse, CreateJobRequest, CreateJobResponse,
     GetJobResponse, GetTimelineResponse, JobListItem, JobProgress,
-    ListJobsResponse, TimelineEvent, format_rfc3339_utc
+    TimelineEvent, format_rfc3339_utc, render_success_envelope
 )
 from app.api.contract_constants import APIContractConstants
 from app.database import get_db
@@ -184,11 +184,11 @@ async def get_job(
         artifact_id=job.artifact_id
     )
     
-    api_response = APIResponse(success=True, data=response_data.model_dump(exclude_none=True))
-    
-    return JSONResponse(
+    # Status-poll hot path: pydantic-core writes the envelope bytes directly
+    return Response(
+        content=render_success_envelope(response_data.model_dump(exclude_none=True)),
         status_code=status.HTTP_200_OK,
-        content=api_response.model_dump(exclude_none=True)
+        media_type="application/json"
     )
 
 
@@ -218,28 +218,29 @@ async def list_jobs(
     # 排序和分页
     jobs = query.order_by(Job.created_at.desc()).offset(offset).limit(limit).all()
     
-    job_items = [
-        JobListItem(
+    # 行数据来自本服务写入的DB列：model_construct跳过逐行校验，
+    # 由模块级JOB_LIST_ITEMS_ADAPTER一次序列化整页（保留artifact_id: null）
+    job_items = JOB_LIST_ITEMS_ADAPTER.dump_python([
+        JobListItem.model_construct(
             job_id=j.id,
             state=j.state,
             created_at=format_rfc3339_utc(j.created_at),
             artifact_id=j.artifact_id
-        ).model_dump()
+        )
         for j in jobs
-    ]
+    ])
     
-    response_data = ListJobsResponse(
-        jobs=job_items,
-        total=total,
-        limit=limit,
-        offset=offset
-    )
-    
-    api_response = APIResponse(success=True, data=response_data.model_dump())
+    response_data = {
+        "jobs": job_items,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    }
     
-    return JSONResponse(
+    return Response(
+        content=render_success_envelope(response_data),
         status_code=status.HTTP_200_OK,
-        content=api_response.model_dump(exclude_none=True)
+        media_type="application/json"
     )
 
 
@@ -4,32 +4,39 @@
 
 """上传处理器（4个端点）"""
 
-import hashlib
+import asyncio
 import hmac
 import logging
 import re
-import uuid
-from datetime import datetime, timedelta
-from typing import List
+from datetime import timedelta
+from typing import List, Optional
 
 from fastapi import Depends, Request, status
-from fastapi.responses import JSONResponse
-from sqlalchemy import func
+from fastapi.responses import Response
+from sqlalchemy import bindparam, delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.api.contract import (
     APIError, APIErrorCode, APIResponse, CompleteUploadRequest,
     CompleteUploadResponse, CreateUploadRequest, CreateUploadResponse,
-    GetChunksResponse, UploadChunkResponse, format_rfc3339_utc
+    GetChunksResponse, UploadChunkResponse, format_rfc3339_utc, render_error_envelope
 )
 from app.api.contract_constants import APIContractConstants
+from app.core.clock import now_utc
+from app.core.config import settings
+from app.core.ids import fast_uuid
+from app.core.ownership import create_ownership_error_response
 from app.database import get_db
 from app.models import Chunk, Job, TimelineEvent, UploadSession
 from app.services.cleanup_handler import cleanup_after_assembly, cleanup_user_expired
 from app.services.deduplicator import check_dedup_post_assembly, check_dedup_pre_upload, DedupDecision
 from app.services.integrity_checker import check_integrity
 from app.services.upload_service import (
-    AssemblyError, check_disk_quota, persist_chunk, assemble_bundle, verify_assembly
+    HASH_STREAM_CHUNK_BYTES, AssemblyError, ChunkWriter, check_disk_quota, new_sha256,
+    assemble_bundle
 )
 
 logger = logging.getLogger(__name__)
@@ -42,12 +49,233 @@ logger = logging.getLogger(__name__)
 # GATE: This validation MUST NOT be removed. Requires RFC.
 _SHA256_HEX_PATTERN = re.compile(r'^[0-9a-f]{64}$')
 
+# Contract thresholds bound once at import.
+# WHY: each check is then a single global load instead of a global + class
+# attribute lookup; the expiry timedelta is built once instead of per create.
+_MAX_BUNDLE_SIZE_BYTES = APIContractConstants.MAX_BUNDLE_SIZE_BYTES
+_MAX_CHUNK_COUNT = APIContractConstants.MAX_CHUNK_COUNT
+_MAX_ACTIVE_UPLOADS_PER_USER = APIContractConstants.MAX_ACTIVE_UPLOADS_PER_USER
+_UPLOAD_EXPIRY = timedelta(hours=APIContractConstants.UPLOAD_EXPIRY_HOURS)
+_CHUNK_SIZE_BYTES = APIContractConstants.CHUNK_SIZE_BYTES
+_MAX_CHUNK_SIZE_BYTES = APIContractConstants.MAX_CHUNK_SIZE_BYTES
+
+# Hot-path statements built once at import.
+# WHY module-level select() + bindparam: the statement object (and its cache key)
+# is constructed once instead of per request; execute() then hits the engine's
+# compiled cache directly instead of re-running the ORM Query → select() build.
+_STMT_GET_SESSION = select(UploadSession).where(
+    UploadSession.id == bindparam("upload_id"),
+    UploadSession.user_id == bindparam("user_id")
+)
+_STMT_COUNT_CHUNKS = select(func.count(Chunk.id)).where(
+    Chunk.upload_id == bindparam("upload_id")
+)
+_STMT_CHUNK_INDICES = select(Chunk.chunk_index).where(
+    Chunk.upload_id == bindparam("upload_id")
+).order_by(Chunk.chunk_index)
+# WHY LIMIT instead of COUNT: the limit check only needs to know whether the user
+# already holds _MAX_ACTIVE_UPLOADS_PER_USER sessions, so the scan over
+# ix_upload_sessions_user_status stops at that many rows.
+_STMT_ACTIVE_UPLOADS = select(UploadSession.id).where(
+    UploadSession.user_id == bindparam("user_id"),
+    UploadSession.status == "in_progress"
+).limit(_MAX_ACTIVE_UPLOADS_PER_USER)
+
+
+def _json_response(api_response: APIResponse, status_code: int) -> Response:
+    """
+    Serialize an APIResponse straight to JSON bytes via pydantic-core.
+    
+    Same bytes as JSONResponse(content=api_response.model_dump(exclude_none=True))
+    (compact separators, UTF-8, no ASCII escaping) without the intermediate dict
+    and the stdlib json.dumps pass — ~5× faster for get_chunks' index lists.
+    """
+    return Response(
+        content=api_response.model_dump_json(exclude_none=True),
+        status_code=status_code,
+        media_type="application/json"
+    )
+
+
+def _prebuild_error(status_code: int, code: APIErrorCode, message: str) -> tuple[int, bytes]:
+    """
+    Render a fixed-message error envelope once at import time.
+    
+    Byte-identical to JSONResponse(APIResponse(...).model_dump(exclude_none=True)),
+    so clients cannot tell a prebuilt error from a per-request one.
+    """
+    return status_code, render_error_envelope(code, message)
+
+
+def _static_error_response(prebuilt: tuple[int, bytes]) -> Response:
+    """Wrap a _prebuild_error() payload — no Pydantic validation or JSON encoding per request."""
+    status_code, body = prebuilt
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+# upload_chunk fixed-message errors (hot rejection paths: bad headers, retries, conflicts)
+_ERR_MISSING_CONTENT_LENGTH = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Missing Content-Length"
+)
+_ERR_EMPTY_CHUNK_BODY = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Empty chunk body"
+)
+_ERR_INVALID_CONTENT_LENGTH = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Invalid Content-Length"
+)
+_ERR_CHUNK_TOO_LARGE = _prebuild_error(
+    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, APIErrorCode.PAYLOAD_TOO_LARGE, "Chunk size exceeds 5MB limit"
+)
+_ERR_MISSING_CHUNK_INDEX = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Missing X-Chunk-Index"
+)
+_ERR_MISSING_CHUNK_HASH = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Missing X-Chunk-Hash"
+)
+_ERR_INVALID_CHUNK_INDEX = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Invalid X-Chunk-Index"
+)
+_ERR_CHUNK_INDEX_OUT_OF_RANGE = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Chunk index out of range"
+)
+_ERR_INVALID_CHUNK_HASH = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Invalid X-Chunk-Hash format"
+)
+_ERR_STORAGE_FULL = _prebuild_error(
+    status.HTTP_429_TOO_MANY_REQUESTS, APIErrorCode.RATE_LIMITED, "Server storage capacity temporarily exceeded. Retry later."
+)
+_ERR_BODY_READ_TIMEOUT = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Chunk body read timed out"
+)
+_ERR_CONTENT_LENGTH_MISMATCH = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Content-Length mismatch"
+)
+_ERR_CHUNK_HASH_MISMATCH = _prebuild_error(
+    status.HTTP_400_BAD_REQUEST, APIErrorCode.INVALID_REQUEST, "Chunk hash mismatch"
+)
+_ERR_CHUNK_HASH_CONFLICT = _prebuild_error(
+    status.HTTP_409_CONFLICT, APIErrorCode.STATE_CONFLICT, "Chunk already exists with different hash"
+)
+_ERR_CHUNK_STORAGE_FAILED = _prebuild_error(
+    status.HTTP_500_INTERNAL_SERVER_ERROR, APIErrorCode.INTERNAL_ERROR, "Chunk storage failed"
+)
+
+
+def _chunk_upsert_statement(db: Session, chunk_id: str, upload_id: str, chunk_index: int, chunk_hash: str):
+    """
+    Build INSERT ... ON CONFLICT (upload_id, chunk_index) for the Chunk table.
+    
+    Backed by the uq_upload_chunk_index unique index. The conflict branch is a
+    no-op update so RETURNING always yields the stored (id, chunk_hash) row.
+    PostgreSQL and SQLite (3.35+) share the same ON CONFLICT/RETURNING syntax.
+    """
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(Chunk).values(
+        id=chunk_id,
+        upload_id=upload_id,
+        chunk_index=chunk_index,
+        chunk_hash=chunk_hash
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[Chunk.upload_id, Chunk.chunk_index],
+        set_={"chunk_hash": Chunk.chunk_hash}
+    ).returning(Chunk.id, Chunk.chunk_hash)
+
+
+# PR#10 V2-H: Job + TimelineEvent + UploadSession in one statement (PostgreSQL only,
+# opt-in via settings.complete_upload_pg_cte).
+# WHY data-modifying CTE: collapses the three unit-of-work flushes into a single
+# round trip. SQLite has no INSERT inside WITH; it is in-process, so the ORM path
+# there costs no network round trips anyway.
+# NOTE: raw SQL bypasses ORM defaults/events — every column the ORM path sets is
+# listed explicitly (Job.state; created_at is a server default on both paths).
+_COMPLETE_UPLOAD_CTE = text(
+    "WITH j AS ("
+    "INSERT INTO jobs (id, user_id, bundle_hash, state) "
+    "VALUES (:job_id, :user_id, :bundle_hash, 'queued') RETURNING id"
+    "), t AS ("
+    "INSERT INTO timeline_events (id, job_id, timestamp, from_state, to_state, trigger) "
+    "SELECT :event_id, j.id, :timestamp, NULL, 'queued', 'job_created' FROM j"
+    ") "
+    "UPDATE upload_sessions SET status = 'completed' WHERE id = :upload_id"
+)
+
+
+def _create_upload_job(db: Session, upload_session: UploadSession, user_id: str) -> str:
+    """
+    Stage the new Job, its job_created TimelineEvent and session status="completed".
+    
+    Nothing is committed here: complete_upload() commits all three at once
+    (V2-H). Returns the new job id.
+    """
+    job_id = fast_uuid()
+    
+    if settings.complete_upload_pg_cte and db.get_bind().dialect.name == "postgresql":
+        db.execute(_COMPLETE_UPLOAD_CTE, {
+            "job_id": job_id,
+            "user_id": user_id,
+            "bundle_hash": upload_session.bundle_hash,
+            "event_id": fast_uuid(),
+            "timestamp": now_utc(),
+            "upload_id": upload_session.id,
+        })
+        # The UPDATE ran outside the unit of work: mirror it on the loaded instance
+        # without marking it dirty, so the session never reads a stale status
+        set_committed_value(upload_session, "status", "completed")
+        return job_id
+    
+    upload_session.status = "completed"
+    
+    job = Job(
+        id=job_id,
+        user_id=user_id,
+        bundle_hash=upload_session.bundle_hash,
+        state="queued"
+    )
+    timeline_event = TimelineEvent(
+        id=fast_uuid(),
+        job_id=job_id,
+        timestamp=now_utc(),
+        from_state=None,
+        to_state="queued",
+        trigger="job_created"
+    )
+    # One flush + one commit: session UPDATE, job and timeline INSERTs
+    # share a single transaction (one fsync on SQLite)
+    db.add_all([job, timeline_event])
+    return job_id
+
+
+def get_upload_session(
+    upload_id: str,
+    request: Request,
+    db: Session = Depends(get_db)
+) -> Optional[UploadSession]:
+    """
+    FastAPI依赖：按(upload_id, user_id)解析上传会话，每个请求最多查询一次
+    
+    Returns None when the session does not exist or belongs to another user;
+    handlers turn that into the unified 404 (anti-enumeration). The result is
+    cached on request.state so other dependencies of the same request reuse it.
+    """
+    user_id = request.state.user_id
+    cache_key = (upload_id, user_id)
+    cached = getattr(request.state, "_upload_session", None)
+    if cached is not None and cached[0] == cache_key:
+        return cached[1]
+    
+    upload_session = db.execute(
+        _STMT_GET_SESSION, {"upload_id": upload_id, "user_id": user_id}
+    ).scalar_one_or_none()
+    request.state._upload_session = (cache_key, upload_session)
+    return upload_session
+
 
 async def create_upload(
     request_body: CreateUploadRequest,
     request: Request,
     db: Session = Depends(get_db)
-) -> JSONResponse:
+) -> Response:
     """
     POST /v1/uploads - 创建上传会话
     
@@ -65,13 +293,10 @@ async def create_upload(
                 message="Only aether_camera capture is allowed"
             )
         )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _json_response(error_response, status.HTTP_400_BAD_REQUEST)
     
     # 硬边界约束（PATCH-8）
-    if request_body.bundle_size > APIContractConstants.MAX_BUNDLE_SIZE_BYTES:
+    if request_body.bundle_size > _MAX_BUNDLE_SIZE_BYTES:
         error_response = APIResponse(
             success=False,
             error=APIError(
@@ -79,12 +304,9 @@ async def create_upload(
                 message="Bundle size exceeds 500MB limit"
             )
         )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _json_response(error_response, status.HTTP_400_BAD_REQUEST)
     
-    if request_body.chunk_count > APIContractConstants.MAX_CHUNK_COUNT:
+    if request_body.chunk_count > _MAX_CHUNK_COUNT:
         error_response = APIResponse(
             success=False,
             error=APIError(
@@ -92,18 +314,12 @@ async def create_upload(
                 message="Chunk count exceeds 200 limit"
             )
         )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _json_response(error_response, status.HTTP_400_BAD_REQUEST)
     
     # 并发限制
-    active_uploads = db.query(UploadSession).filter(
-        UploadSession.user_id == user_id,
-        UploadSession.status == "in_progress"
-    ).count()
+    active_uploads = len(db.execute(_STMT_ACTIVE_UPLOADS, {"user_id": user_id}).all())
     
-    if active_uploads >= APIContractConstants.MAX_ACTIVE_UPLOADS_PER_USER:
+    if active_uploads >= _MAX_ACTIVE_UPLOADS_PER_USER:
         error_response = APIResponse(
             success=False,
             error=APIError(
@@ -111,10 +327,7 @@ async def create_upload(
                 message="Already has active upload session"
             )
         )
-        return JSONResponse(
-            status_code=status.HTTP_409_CONFLICT,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _json_response(error_response, status.HTTP_409_CONFLICT)
     
     # PR#10: User-level cleanup of expired sessions
     cleanup_user_expired(user_id, db)
@@ -129,10 +342,7 @@ async def create_upload(
             job_id=dedup_result.existing_job_id
         )
         api_response = APIResponse(success=True, data=response_data.model_dump())
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=api_response.model_dump(exclude_none=True)
-        )
+        return _json_response(api_response, status.HTTP_200_OK)
     
     # PR#10: Check disk quota before accepting new upload
     allowed, usage = check_disk_quota()
@@ -150,14 +360,11 @@ async def create_upload(
                 message="Server storage capacity temporarily exceeded. Retry later."
             )
         )
-        return JSONResponse(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _json_response(error_response, status.HTTP_429_TOO_MANY_REQUESTS)
     
     # 创建上传会话
-    upload_id = str(uuid.uuid4())
-    expires_at = datetime.utcnow() + timedelta(hours=APIContractConstants.UPLOAD_EXPIRY_HOURS)
+    upload_id = fast_uuid()
+    expires_at = now_utc() + _UPLOAD_EXPIRY
     
     upload_session = UploadSession(
         id=upload_id,
@@ -178,96 +385,45 @@ async def create_upload(
     response_data = CreateUploadResponse(
         upload_id=upload_id,
         upload_url=f"/v1/uploads/{upload_id}/chunks",
-        chunk_size=APIContractConstants.CHUNK_SIZE_BYTES,
+        chunk_size=_CHUNK_SIZE_BYTES,
         expires_at=format_rfc3339_utc(expires_at)
     )
     
     api_response = APIResponse(success=True, data=response_data.model_dump())
     
-    return JSONResponse(
-        status_code=status.HTTP_201_CREATED,
-        content=api_response.model_dump(exclude_none=True)
-    )
+    return _json_response(api_response, status.HTTP_201_CREATED)
 
 
 async def upload_chunk(
     upload_id: str,
     request: Request,
-    db: Session = Depends(get_db)
-) -> JSONResponse:
+    db: Session = Depends(get_db),
+    upload_session: Optional[UploadSession] = Depends(get_upload_session)
+) -> Response:
     """
     PATCH /v1/uploads/{id}/chunks - 上传分片
     
     GATE-5: Content-Length校验
     PATCH-8: 分片大小限制
     """
-    user_id = request.state.user_id
-    
-    # 获取上传会话
-    upload_session = db.query(UploadSession).filter(
-        UploadSession.id == upload_id,
-        UploadSession.user_id == user_id
-    ).first()
-    
     if not upload_session:
-        from app.core.ownership import create_ownership_error_response
         return create_ownership_error_response("Upload session")
     
     # GATE-5: Content-Length校验
     content_length = request.headers.get("Content-Length")
     if not content_length:
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.INVALID_REQUEST,
-                message="Missing Content-Length"
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _static_error_response(_ERR_MISSING_CONTENT_LENGTH)
     
     try:
         content_length_int = int(content_length)
         if content_length_int < 1:
-            error_response = APIResponse(
-                success=False,
-                error=APIError(
-                    code=APIErrorCode.INVALID_REQUEST,
-                    message="Empty chunk body"
-                )
-            )
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content=error_response.model_dump(exclude_none=True)
-            )
+            return _static_error_response(_ERR_EMPTY_CHUNK_BODY)
     except ValueError:
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.INVALID_REQUEST,
-                message="Invalid Content-Length"
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _static_error_response(_ERR_INVALID_CONTENT_LENGTH)
     
     # PATCH-8: 分片大小限制
-    if content_length_int > APIContractConstants.MAX_CHUNK_SIZE_BYTES:
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.PAYLOAD_TOO_LARGE,
-                message="Chunk size exceeds 5MB limit"
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            content=error_response.model_dump(exclude_none=True)
-        )
+    if content_length_int > _MAX_CHUNK_SIZE_BYTES:
+        return _static_error_response(_ERR_CHUNK_TOO_LARGE)
     
     # PR#10 V5-C: Early rejection optimization — validate headers BEFORE reading body
     # 获取chunk index和hash
@@ -275,62 +431,22 @@ async def upload_chunk(
     chunk_hash = request.headers.get("X-Chunk-Hash")
     
     if not chunk_index_str:
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.INVALID_REQUEST,
-                message="Missing X-Chunk-Index"
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _static_error_response(_ERR_MISSING_CHUNK_INDEX)
     
     if not chunk_hash:
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.INVALID_REQUEST,
-                message="Missing X-Chunk-Hash"
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _static_error_response(_ERR_MISSING_CHUNK_HASH)
     
     try:
         chunk_index = int(chunk_index_str)
     except ValueError:
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.INVALID_REQUEST,
-                message="Invalid X-Chunk-Index"
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _static_error_response(_ERR_INVALID_CHUNK_INDEX)
     
     # PR#10 V2-B: Validate chunk_index range
     # SEAL FIX: Validate chunk_index is within expected range.
     # Without this, an attacker could submit chunk_index=999999,
     # causing unexpected file paths (000999999.chunk) or DB records.
     if chunk_index < 0 or chunk_index >= upload_session.chunk_count:
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.INVALID_REQUEST,
-                message="Chunk index out of range"
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _static_error_response(_ERR_CHUNK_INDEX_OUT_OF_RANGE)
     
     # PR#10 V2-B: Validate chunk_hash format
     # SEAL FIX: Validate chunk_hash format. This header is user-controlled input.
@@ -339,199 +455,171 @@ async def upload_chunk(
     # Must match SHA-256 hexdigest format: exactly 64 lowercase hex characters.
     # GATE: This validation MUST NOT be removed. Requires RFC.
     if not _SHA256_HEX_PATTERN.match(chunk_hash.lower()):
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.INVALID_REQUEST,
-                message="Invalid X-Chunk-Hash format"
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _static_error_response(_ERR_INVALID_CHUNK_HASH)
     
     # Normalize to lowercase (consistent with hashlib.hexdigest() output)
     chunk_hash = chunk_hash.lower()
+    # Raw 32-byte form for the body hash check (regex above guarantees valid hex)
+    expected_digest = bytes.fromhex(chunk_hash)
     
     # PR#10 V5-C: Check disk quota BEFORE reading body (early rejection)
     allowed, usage = check_disk_quota()
     if not allowed:
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.RATE_LIMITED,
-                message="Server storage capacity temporarily exceeded. Retry later."
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            content=error_response.model_dump(exclude_none=True)
-        )
-    
-    # PR#10 V5-A: Stream-based or memoryview chunked hashing (eliminate double hash)
-    # WHY: Current code reads entire 5MB chunk into memory, then hashes it.
-    # This causes peak memory = 5MB. With memoryview chunked hashing:
-    # - Peak memory = chunk size (5MB) but eliminates double hash CPU overhead
-    # - Hash computed incrementally during read, not after full read
-    # - persist_chunk() can skip re-hashing (hash already computed)
-    # 
-    # WHY memoryview: Python bytes slicing (body[i:j]) creates copies.
-    # memoryview provides zero-copy slices for hashlib.update().
-    # hashlib.sha256().update() natively accepts memoryview (zero-copy to OpenSSL).
-    #
-    # Fallback to scheme B (memoryview chunked) if request.stream() unavailable.
-    # Scheme A (true streaming) requires request.stream() which may not work
-    # with all FastAPI deployments (proxy buffering, middleware, etc.).
-    body = await request.body()
-    
-    # GATE-5: 验证Content-Length与实际body一致
-    if len(body) != content_length_int:
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.INVALID_REQUEST,
-                message="Content-Length mismatch"
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
-    
-    # PR#10 V5-A + V5-B: Memoryview chunked hashing (eliminate double hash)
-    # WHY: Avoids double hash overhead. Hash computed here, persist_chunk() skips re-hash.
-    # WHY memoryview: Zero-copy slices for hashlib.update() (avoids Python bytes copy).
-    from app.services.upload_service import HASH_STREAM_CHUNK_BYTES
-    mv = memoryview(body)
-    hasher = hashlib.sha256()
-    for i in range(0, len(mv), HASH_STREAM_CHUNK_BYTES):
-        hasher.update(mv[i:i+HASH_STREAM_CHUNK_BYTES])  # Zero-copy to OpenSSL
-    actual_hash = hasher.hexdigest()
-    
-    # PR#10 V2-A: Fix timing-unsafe hash comparison
-    # SEAL FIX: Use hmac.compare_digest() for timing-safe comparison.
-    # Python's != short-circuits on first differing byte, leaking hash
-    # similarity via timing. INV-U16 applies to ALL hash comparisons,
-    # including pre-existing code modified by PR#10.
-    # GATE: This comparison MUST use hmac.compare_digest(). Requires RFC to change.
-    if not hmac.compare_digest(actual_hash, chunk_hash):
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.INVALID_REQUEST,
-                message="Chunk hash mismatch"
-            )
-        )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
+        return _static_error_response(_ERR_STORAGE_FULL)
+    
+    # PR#10 V5-A: True streaming (scheme A) — hash + write each batch as it arrives
+    # WHY: request.body() keeps every received part AND their b"".join() copy, so
+    # peak memory is 2× chunk size and the bytes are walked again to hash and
+    # again to write. Here parts are copied once into a buffer sized by the
+    # validated Content-Length (≤ MAX_CHUNK_SIZE_BYTES); every
+    # HASH_STREAM_CHUNK_BYTES batch is then hashed AND written to the chunk's
+    # .tmp file in one worker-thread pass while it is still cache-hot.
+    # WHY wait_for per receive: a client that stops sending mid-body would
+    # otherwise pin this coroutine and its 5MB buffer indefinitely.
+    # WHY off-loop: hashlib and os.write release the GIL, so the loop keeps
+    # receiving. At most one batch is in flight, so the writer is never shared.
+    try:
+        writer = await ChunkWriter.open_async(
+            upload_id, chunk_index, content_length_int, hasher=new_sha256()
         )
-    
-    # 检查分片是否已存在
-    existing_chunk = db.query(Chunk).filter(
-        Chunk.upload_id == upload_id,
-        Chunk.chunk_index == chunk_index
-    ).first()
-    
-    if existing_chunk:
-        # PR#10 V2-A: Fix timing-unsafe hash comparison
-        # SEAL FIX: Existing chunk hash comparison must also be timing-safe.
-        if not hmac.compare_digest(existing_chunk.chunk_hash, chunk_hash):
-            # 同index不同hash → 409
-            error_response = APIResponse(
-                success=False,
-                error=APIError(
-                    code=APIErrorCode.STATE_CONFLICT,
-                    message="Chunk already exists with different hash"
-                )
-            )
-            return JSONResponse(
-                status_code=status.HTTP_409_CONFLICT,
-                content=error_response.model_dump(exclude_none=True)
-            )
-        else:
-            # 幂等成功
-            chunk_status = "already_present"
-            total_received = db.query(Chunk).filter(Chunk.upload_id == upload_id).count()
-    else:
-        # PR#10 PATCH-O + V3-B: File-first, DB-second ordering
-        # CRITICAL: upload_chunk()中必须先调用persist_chunk()，成功后再db.commit()
-        # 如果persist_chunk()失败，返回HTTP 500，不提交DB
-        # 正确顺序：1. persist_chunk()写入文件 2. db.add(chunk) + db.commit()记录DB
+    except AssemblyError as e:
+        logger.error("Chunk persist failed for upload_id=%s chunk_index=%d: %s", upload_id, chunk_index, e)
+        return _static_error_response(_ERR_CHUNK_STORAGE_FAILED)
+    
+    body = bytearray(content_length_int)
+    view = memoryview(body)  # Fixed-size buffer: slice writes stay legal while exported
+    received = 0
+    flushed = 0
+    pending = None  # In-flight writer.write_async() batch
+    stream = request.stream()
+    try:
         try:
-            # Step 1: Persist chunk to disk (may raise AssemblyError)
-            # PR#10 V5-A: Hash already computed above, persist_chunk() can skip re-hash
-            # (For now, persist_chunk still re-hashes for defense-in-depth.
-            # Future optimization: pass pre-computed hash to skip re-hash.)
-            persist_chunk(upload_id, chunk_index, body, chunk_hash)
-        except AssemblyError as e:
-            # FAIL-CLOSED: File write failed → don't commit to DB → return 500
-            logger.error("Chunk persist failed for upload_id=%s chunk_index=%d: %s", upload_id, chunk_index, e)
-            error_response = APIResponse(
-                success=False,
-                error=APIError(
-                    code=APIErrorCode.INTERNAL_ERROR,
-                    message="Chunk storage failed"
-                )
-            )
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content=error_response.model_dump(exclude_none=True)
-            )
+            while True:
+                try:
+                    part = await asyncio.wait_for(
+                        stream.__anext__(), settings.chunk_body_read_timeout_seconds
+                    )
+                except StopAsyncIteration:
+                    break
+                if received + len(part) > content_length_int:
+                    received += len(part)
+                    break
+                body[received:received + len(part)] = part
+                received += len(part)
+                if received - flushed >= HASH_STREAM_CHUNK_BYTES:
+                    if pending is not None:
+                        await pending
+                    pending = asyncio.ensure_future(writer.write_async(view[flushed:received]))
+                    flushed = received
+        except asyncio.TimeoutError:
+            return _static_error_response(_ERR_BODY_READ_TIMEOUT)
         
-        # Step 2: Only AFTER file is persisted, commit DB record
-        chunk = Chunk(
-            id=str(uuid.uuid4()),
-            upload_id=upload_id,
-            chunk_index=chunk_index,
-            chunk_hash=chunk_hash
-        )
-        db.add(chunk)
-        db.commit()
-        chunk_status = "stored"
-        total_received = db.query(Chunk).filter(Chunk.upload_id == upload_id).count()
+        # PATCH-8: Body longer than the 5MB limit regardless of declared Content-Length
+        if received > _MAX_CHUNK_SIZE_BYTES:
+            return _static_error_response(_ERR_CHUNK_TOO_LARGE)
+        
+        # GATE-5: 验证Content-Length与实际body一致
+        if received != content_length_int:
+            return _static_error_response(_ERR_CONTENT_LENGTH_MISMATCH)
+        
+        if pending is not None:
+            await pending
+        if flushed < received:
+            await writer.write_async(view[flushed:received])
+        # Raw digest: skips hex encoding and halves the constant-time compare input
+        actual_digest = writer.hasher.digest()
+        
+        # PR#10 V2-A: Fix timing-unsafe hash comparison
+        # SEAL FIX: Use hmac.compare_digest() for timing-safe comparison.
+        # Python's != short-circuits on first differing byte, leaking hash
+        # similarity via timing. INV-U16 applies to ALL hash comparisons,
+        # including pre-existing code modified by PR#10.
+        # GATE: This comparison MUST use hmac.compare_digest(). Requires RFC to change.
+        if not hmac.compare_digest(actual_digest, expected_digest):
+            return _static_error_response(_ERR_CHUNK_HASH_MISMATCH)
+        
+        # PR#10 PATCH-O + V3-B: Durable file first, DB second, publish last
+        # Step 1: fsync the .tmp on the chunk I/O pool (may raise AssemblyError).
+        # WHY before the INSERT: no DB write transaction may stay open across an
+        # await — on SQLite a second request's INSERT would block the event loop
+        # on the database lock while this coroutine waits to commit.
+        # WHY not renamed yet: only the upsert winner may touch final_path; a
+        # conflicting or duplicate upload must never replace a stored chunk.
+        await writer.sync_async()
+        
+        # Step 2: Single round-trip existence check + insert (INSERT ... ON CONFLICT)
+        # WHY: SELECT-then-INSERT costs two round trips per chunk and races with
+        # concurrent retries. The no-op DO UPDATE makes RETURNING yield the winning
+        # row in both cases: our id → inserted, any other id → chunk already present.
+        # No await between the INSERT and its commit/rollback.
+        chunk_id = fast_uuid()
+        upserted = db.execute(
+            _chunk_upsert_statement(db, chunk_id, upload_id, chunk_index, chunk_hash)
+        ).one()
+        
+        if upserted.id != chunk_id:
+            db.rollback()
+            # PR#10 V2-A: Fix timing-unsafe hash comparison
+            # SEAL FIX: Existing chunk hash comparison must also be timing-safe.
+            if not hmac.compare_digest(upserted.chunk_hash, chunk_hash):
+                # 同index不同hash → 409（.tmp由finally丢弃，已有chunk文件不被覆盖）
+                return _static_error_response(_ERR_CHUNK_HASH_CONFLICT)
+            # 幂等成功（.tmp由finally丢弃，已有chunk文件不被覆盖）
+            chunk_status = "already_present"
+        else:
+            db.commit()
+            # Step 3: This request won the index — atomic rename into place
+            try:
+                await writer.publish_async()
+            except AssemblyError:
+                # FAIL-CLOSED: never leave a committed Chunk record without its file
+                db.execute(delete(Chunk).where(Chunk.id == chunk_id))
+                db.commit()
+                raise
+            chunk_status = "stored"
+    except AssemblyError as e:
+        # FAIL-CLOSED: A streamed batch failed to write → nothing was committed
+        logger.error("Chunk persist failed for upload_id=%s chunk_index=%d: %s", upload_id, chunk_index, e)
+        return _static_error_response(_ERR_CHUNK_STORAGE_FAILED)
+    finally:
+        if pending is not None:
+            # Never close the .tmp fd under an in-flight batch write
+            await asyncio.gather(pending, return_exceptions=True)
+        # Drops the .tmp on every rejection path; no-op after a successful publish
+        writer.abort()
+    
+    # PR#10 V5-D: Plain COUNT — Query.count() wraps the ORM select in a subquery
+    total_received = db.execute(_STMT_COUNT_CHUNKS, {"upload_id": upload_id}).scalar_one()
     
     response_data = UploadChunkResponse(
         chunk_index=chunk_index,
         chunk_status=chunk_status,
-        received_size=len(body),
+        received_size=received,
         total_received=total_received,
         total_chunks=upload_session.chunk_count
     )
     
     api_response = APIResponse(success=True, data=response_data.model_dump())
     
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=api_response.model_dump(exclude_none=True)
-    )
+    return _json_response(api_response, status.HTTP_200_OK)
 
 
 async def get_chunks(
     upload_id: str,
     request: Request,
-    db: Session = Depends(get_db)
-) -> JSONResponse:
+    db: Session = Depends(get_db),
+    upload_session: Optional[UploadSession] = Depends(get_upload_session)
+) -> Response:
     """
     GET /v1/uploads/{id}/chunks - 查询已上传分片
     """
-    user_id = request.state.user_id
-    
-    upload_session = db.query(UploadSession).filter(
-        UploadSession.id == upload_id,
-        UploadSession.user_id == user_id
-    ).first()
-    
     if not upload_session:
-        from app.core.ownership import create_ownership_error_response
         return create_ownership_error_response("Upload session")
     
     # 获取已上传分片
-    chunks = db.query(Chunk).filter(Chunk.upload_id == upload_id).all()
-    received_chunks = sorted([c.chunk_index for c in chunks])
-    all_chunks = set(range(upload_session.chunk_count))
-    missing_chunks = sorted(list(all_chunks - set(received_chunks)))
+    # PR#10 V5-D: Project chunk_index only — no ORM Chunk objects, index-ordered by the DB
+    received_chunks = db.execute(_STMT_CHUNK_INDICES, {"upload_id": upload_id}).scalars().all()
+    missing_chunks = sorted(set(range(upload_session.chunk_count)).difference(received_chunks))
     
     response_data = GetChunksResponse(
         upload_id=upload_id,
@@ -544,18 +632,16 @@ async def get_chunks(
     
     api_response = APIResponse(success=True, data=response_data.model_dump())
     
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=api_response.model_dump(exclude_none=True)
-    )
+    return _json_response(api_response, status.HTTP_200_OK)
 
 
 async def complete_upload(
     upload_id: str,
     request_body: CompleteUploadRequest,
     request: Request,
-    db: Session = Depends(get_db)
-) -> JSONResponse:
+    db: Session = Depends(get_db),
+    upload_session: Optional[UploadSession] = Depends(get_upload_session)
+) -> Response:
     """
     POST /v1/uploads/{id}/complete - 完成上传
     
@@ -564,13 +650,7 @@ async def complete_upload(
     """
     user_id = request.state.user_id
     
-    upload_session = db.query(UploadSession).filter(
-        UploadSession.id == upload_id,
-        UploadSession.user_id == user_id
-    ).first()
-    
     if not upload_session:
-        from app.core.ownership import create_ownership_error_response
         return create_ownership_error_response("Upload session")
     
     # 验证bundle_hash一致性
@@ -582,22 +662,15 @@ async def complete_upload(
                 message="Bundle hash mismatch"
             )
         )
-        return JSONResponse(
-            status_code=status.HTTP_409_CONFLICT,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _json_response(error_response, status.HTTP_409_CONFLICT)
     
     # PR#10 V5-D: DB query optimization — use COUNT query instead of loading all chunks
-    received_count = db.query(func.count(Chunk.id)).filter(
-        Chunk.upload_id == upload_id
-    ).scalar()
+    received_count = db.execute(_STMT_COUNT_CHUNKS, {"upload_id": upload_id}).scalar_one()
     
     if received_count != upload_session.chunk_count:
         # Slow path: need to find missing chunks
-        chunks = db.query(Chunk).filter(Chunk.upload_id == upload_id).all()
-        received_indices = set(c.chunk_index for c in chunks)
-        all_indices = set(range(upload_session.chunk_count))
-        missing_indices = sorted(list(all_indices - received_indices))
+        received_indices = db.execute(_STMT_CHUNK_INDICES, {"upload_id": upload_id}).scalars()
+        missing_indices = sorted(set(range(upload_session.chunk_count)).difference(received_indices))
         
         # PATCH-2: details.missing使用int_array
         error_response = APIResponse(
@@ -608,10 +681,7 @@ async def complete_upload(
                 details={"missing": missing_indices}  # int_array
             )
         )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _json_response(error_response, status.HTTP_400_BAD_REQUEST)
     
     # PR#10: Full pipeline — assemble → verify → dedup → create job → cleanup
     try:
@@ -619,6 +689,8 @@ async def complete_upload(
         assembly_result = assemble_bundle(upload_id, upload_session, db)
         
         # Step 2: Five-layer integrity verification
+        # WHY no re-read: assembly_result.sha256_hex and chunk_hashes were computed while
+        # the bundle was being written (INV-U2), so L1/L2 check them directly (INV-U19).
         integrity_ok = check_integrity(
             assembly_sha256_hex=assembly_result.sha256_hex,
             expected_bundle_hash=upload_session.bundle_hash,
@@ -639,10 +711,7 @@ async def complete_upload(
                     message="HASH_MISMATCH"  # Unified error (anti-enumeration)
                 )
             )
-            return JSONResponse(
-                status_code=status.HTTP_409_CONFLICT,
-                content=error_response.model_dump(exclude_none=True)
-            )
+            return _json_response(error_response, status.HTTP_409_CONFLICT)
         
         # Step 3: Post-assembly dedup check
         dedup = check_dedup_post_assembly(upload_session.bundle_hash, user_id, db)
@@ -658,10 +727,7 @@ async def complete_upload(
                 job_id=dedup.existing_job_id
             )
             api_response = APIResponse(success=True, data=response_data.model_dump())
-            return JSONResponse(
-                status_code=status.HTTP_200_OK,
-                content=api_response.model_dump(exclude_none=True)
-            )
+            return _json_response(api_response, status.HTTP_200_OK)
         
         # Step 4: No duplicate — create new Job + Timeline (atomic transaction)
         # PR#10 V2-H: Single-transaction complete_upload
@@ -669,27 +735,7 @@ async def complete_upload(
         # If Job creation succeeds but TimelineEvent fails, we have a Job with no timeline.
         # Using a single commit ensures all-or-nothing.
         try:
-            upload_session.status = "completed"
-            
-            job_id = str(uuid.uuid4())
-            job = Job(
-                id=job_id,
-                user_id=user_id,
-                bundle_hash=upload_session.bundle_hash,
-                state="queued"
-            )
-            db.add(job)
-            
-            timeline_event = TimelineEvent(
-                id=str(uuid.uuid4()),
-                job_id=job_id,
-                timestamp=datetime.utcnow(),
-                from_state=None,
-                to_state="queued",
-                trigger="job_created"
-            )
-            db.add(timeline_event)
-            
+            job_id = _create_upload_job(db, upload_session, user_id)
             db.commit()  # Single commit for all 3 operations
         except Exception as e:
             # FAIL-CLOSED: If DB fails, don't claim success.
@@ -705,10 +751,7 @@ async def complete_upload(
                     message="Upload completion failed"
                 )
             )
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content=error_response.model_dump(exclude_none=True)
-            )
+            return _json_response(error_response, status.HTTP_500_INTERNAL_SERVER_ERROR)
         
         # Step 5: Immediate cleanup of chunk files
         cleanup_after_assembly(upload_id, success=True)
@@ -722,10 +765,7 @@ async def complete_upload(
         
         api_response = APIResponse(success=True, data=response_data.model_dump())
         
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=api_response.model_dump(exclude_none=True)
-        )
+        return _json_response(api_response, status.HTTP_200_OK)
     
     except AssemblyError as e:
         # FAIL-CLOSED: Assembly failed → return 409 to client. Never return 200 on failure.
@@ -739,8 +779,5 @@ async def complete_upload(
                 message="HASH_MISMATCH"  # Never expose internal error details
             )
         )
-        return JSONResponse(
-            status_code=status.HTTP_409_CONFLICT,
-            content=error_response.model_dump(exclude_none=True)
-        )
+        return _json_response(error_response, status.HTTP_409_CONFLICT)
 
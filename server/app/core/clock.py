@@ -0,0 +1,34 @@
+# PR#10 — Upload hot path
+
+"""粗粒度UTC时钟（expires_at / timeline时间戳）"""
+
+import time
+from datetime import datetime, timedelta
+
+# WHY 100ms: expires_at is hours in the future and timeline timestamps are
+# serialized at second resolution (RFC3339 "Z"), so 100ms of drift is invisible.
+CLOCK_RESYNC_SECONDS: float = 0.1
+
+
+class _Clock:
+    """Wall-clock anchor re-read at most once per CLOCK_RESYNC_SECONDS."""
+
+    # (monotonic, wall) swapped as one tuple so readers never see a torn pair
+    _anchor: tuple[float, datetime] = (float("-inf"), datetime.min)
+
+
+def now_utc() -> datetime:
+    """
+    Return naive UTC now, equivalent to datetime.utcnow() within CLOCK_RESYNC_SECONDS.
+
+    Between resyncs the value is derived from the monotonic clock, so it never
+    goes backwards inside one anchor window.
+    """
+    mono = time.monotonic()
+    anchor_mono, anchor_wall = _Clock._anchor
+    elapsed = mono - anchor_mono
+    if elapsed > CLOCK_RESYNC_SECONDS:
+        wall = datetime.utcnow()
+        _Clock._anchor = (mono, wall)
+        return wall
+    return anchor_wall + timedelta(seconds=elapsed)
@@ -16,6 +16,9 @@ class Settings(BaseSettings):
 
     # ========== Database ==========
     database_url: str = "sqlite:///./aether3d.db"
+    # complete_upload: write Job + TimelineEvent + session UPDATE as one CTE statement
+    # on PostgreSQL (opt-in; the ORM unit of work is used otherwise)
+    complete_upload_pg_cte: bool = False
 
     # ========== Storage Paths (RAW, from env) ==========
     upload_dir: str = "storage/uploads"
@@ -26,10 +29,25 @@ class Settings(BaseSettings):
     uploads_retention_days: int = 7
     artifacts_retention_days: int = 0
     ns_work_retention_days: int = 1
+    # Concurrent unlink/rmtree workers per retention sweep
+    cleanup_io_workers: int = 16
+    # Tier 2/3 cleanup: remove large upload dirs with native `rm -rf` (False = shutil.rmtree only)
+    cleanup_native_rm: bool = True
 
     # ========== Upload limits ==========
     max_upload_mb: int = 500
 
+    # ========== Idempotency store ==========
+    # "memory" (per process, LRU + TTL) or "redis" (shared across workers)
+    idempotency_backend: str = "memory"
+    idempotency_cache_max_entries: int = 100_000
+    idempotency_redis_url: str = "redis://localhost:6379/0"
+
+    # ========== Chunk I/O (dedicated ChunkWriter thread pool) ==========
+    chunk_io_workers: int = 8
+    # Per-receive deadline while streaming a chunk body (slow-client guard)
+    chunk_body_read_timeout_seconds: float = 30.0
+
     # ========== Resolved Paths (runtime only) ==========
     upload_path: Path = Path()
     artifact_path: Path = Path()
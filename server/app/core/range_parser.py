@@ -3,6 +3,8 @@
 
 """Range解析工具（单range，严格拒绝不支持的格式）"""
 
+import re
+
 from fastapi import status
 from fastapi.responses import JSONResponse
 
@@ -14,59 +16,60 @@ class RangeParseError(Exception):
     pass
 
 
-def parse_single_range(range_header: str, total_size: int) -> tuple[int, int]:
+# PR1E: 唯一接受的形态 bytes=<start>-<end>（ASCII数字，无空白/符号）
+# WHY one compiled fullmatch: the valid path is a single C-level scan instead of
+# a chain of startswith/endswith/in/split passes. re.ASCII keeps \d from
+# accepting non-ASCII digits that int() would otherwise parse.
+_SINGLE_RANGE_PATTERN = re.compile(r"bytes=(\d+)-(\d+)", re.ASCII)
+
+
+def _classify_range_error(range_header: str) -> str:
     """
-    PR1E: 解析单Range header，严格拒绝不支持的格式
-    
-    Args:
-        range_header: Range header值（例如 "bytes=0-1023"）
-        total_size: 文件总大小（字节）
-    
-    Returns:
-        (start, end): 起始和结束字节位置（包含）
-    
-    Raises:
-        RangeParseError: 如果格式不支持或无效
+    为不匹配的Range header选择具体的拒绝原因（仅在拒绝路径上执行）
     """
     # PR1E: 明确拒绝suffix ranges (bytes=-500)
     if range_header.startswith("bytes=-"):
-        raise RangeParseError("Suffix ranges not supported")
+        return "Suffix ranges not supported"
     
     # PR1E: 明确拒绝open-ended ranges (bytes=500-)
     if range_header.endswith("-") and not range_header.endswith("--"):
-        raise RangeParseError("Open-ended ranges not supported")
+        return "Open-ended ranges not supported"
     
     # PR1E: 明确拒绝多range（包含逗号）
     if "," in range_header:
-        raise RangeParseError("Multi-range not supported")
+        return "Multi-range not supported"
     
-    # 解析格式: bytes=start-end
     if not range_header.startswith("bytes="):
-        raise RangeParseError("Invalid Range format: must start with 'bytes='")
+        return "Invalid Range format: must start with 'bytes='"
     
-    range_spec = range_header[6:]  # 移除 "bytes=" 前缀
+    if "-" not in range_header[6:]:
+        return "Invalid Range format: missing '-' separator"
     
-    # 解析start-end
-    if "-" not in range_spec:
-        raise RangeParseError("Invalid Range format: missing '-' separator")
+    return "Invalid Range format: start and end must be integers"
+
+
+def parse_single_range(range_header: str, total_size: int) -> tuple[int, int]:
+    """
+    PR1E: 解析单Range header，严格拒绝不支持的格式
     
-    parts = range_spec.split("-", 1)
-    if len(parts) != 2:
-        raise RangeParseError("Invalid Range format: invalid separator")
+    Args:
+        range_header: Range header值（例如 "bytes=0-1023"）
+        total_size: 文件总大小（字节）
     
-    start_str, end_str = parts
+    Returns:
+        (start, end): 起始和结束字节位置（包含）
     
-    # 验证start和end都是数字
-    try:
-        start = int(start_str)
-        end = int(end_str)
-    except ValueError:
-        raise RangeParseError("Invalid Range format: start and end must be integers")
+    Raises:
+        RangeParseError: 如果格式不支持或无效
+    """
+    match = _SINGLE_RANGE_PATTERN.fullmatch(range_header)
+    if match is None:
+        raise RangeParseError(_classify_range_error(range_header))
     
-    # 验证范围有效性
-    if start < 0:
-        raise RangeParseError("Range start must be non-negative")
+    start = int(match.group(1))
+    end = int(match.group(2))
     
+    # 验证范围有效性（start >= 0 由pattern保证）
     if end < start:
         raise RangeParseError("Range end must be >= start")
     
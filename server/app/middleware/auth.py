@@ -1,8 +1,22 @@
+import hmac
+import re
+
 from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.core.config import settings
+from app.middleware.header_cache import cached_header
+
+# Bound once at import: settings are immutable after startup, so dispatch reads
+# a module global instead of going through the pydantic model per request.
+# Kept as bytes for hmac.compare_digest (constant-time, no early exit on mismatch).
+_API_KEY_BYTES = settings.api_key.encode() if settings.api_key else b""
+
+# 401 body rendered once; each rejection only wraps the cached bytes
+_UNAUTHORIZED_BODY = JSONResponse(
+    content={"error": "UNAUTHORIZED", "message": "Invalid or missing API key"},
+).body
 
 
 class AuthMiddleware(BaseHTTPMiddleware):
@@ -14,26 +28,29 @@ class AuthMiddleware(BaseHTTPMiddleware):
         "/openapi.json",
         "/redoc",
     ]
+    # Exact match → one frozenset probe; sub-paths (/docs/*) → one compiled regex
+    WHITELIST_EXACT = frozenset(WHITELIST_PATHS)
+    WHITELIST_PREFIX_RE = re.compile(
+        "(?:" + "|".join(re.escape(p) for p in WHITELIST_PATHS) + ")/"
+    )
     
     async def dispatch(self, request: Request, call_next):
         # If API_KEY is empty, disable auth
-        if not settings.api_key:
+        if not _API_KEY_BYTES:
             return await call_next(request)
         
         # Check whitelist (exact match or startswith for /docs/*)
         path = request.url.path
-        if any(
-            path == whitelist_path or path.startswith(whitelist_path + "/")
-            for whitelist_path in self.WHITELIST_PATHS
-        ):
+        if path in self.WHITELIST_EXACT or self.WHITELIST_PREFIX_RE.match(path):
             return await call_next(request)
         
         # Check API key
-        api_key = request.headers.get("X-API-Key")
-        if api_key != settings.api_key:
-            return JSONResponse(
+        api_key = cached_header(request, b"x-api-key")
+        if not hmac.compare_digest(api_key.encode(), _API_KEY_BYTES):
+            return Response(
+                content=_UNAUTHORIZED_BODY,
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"error": "UNAUTHORIZED", "message": "Invalid or missing API key"},
+                media_type="application/json",
             )
         
         return await call_next(request)
@@ -0,0 +1,90 @@
+# PR#3 — API Contract v2.0
+# Stage: WHITEBOX | Camera-only
+# Endpoints: 12 | HTTP Codes: 10 (3 success + 7 error) | Business Errors: 7
+
+"""网关中间件：Request-Id（GATE-7）+ 身份（PATCH-1）+ 限流（PATCH-1）单次ASGI处理"""
+
+import time
+
+from fastapi import status
+from fastapi.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middleware.header_cache import scan_headers
+from app.middleware.identity import EXEMPT_PATHS, INVALID_DEVICE_ID_BODY, is_valid_device_id
+from app.middleware.rate_limit import (
+    RATE_LIMIT_RULES,
+    TokenBucketLimiter,
+    build_rate_limited_response,
+    match_endpoint_key,
+)
+from app.middleware.request_id import resolve_request_id
+
+# 进程内令牌桶（与_idempotency_cache相同：单进程有效）
+_rate_limiter = TokenBucketLimiter()
+
+
+class GatewayMiddleware:
+    """
+    Pure ASGI request-id / identity / rate-limit layer — the only place this
+    logic runs (request_id.py, identity.py and rate_limit.py hold the shared
+    helpers). One layer instead of three BaseHTTPMiddleware classes, so no
+    per-layer task group, Request object or response re-wrapping.
+
+    Order within the pass:
+    1. Request-Id: resolve (client value or generated), store in
+       request.state.request_id, stamp X-Request-Id on every response start
+    2. Identity: X-Device-Id must be a canonical UUID v4 (GATE-8: /health exempt);
+       sets request.state.device_id / user_id (1:1 in the whitebox stage)
+    3. Rate Limit: per-(device_id, endpoint) token bucket → 429 RATE_LIMITED
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        hdr = scan_headers(scope)
+        state = scope["state"]
+
+        # 1. Request-Id
+        request_id = resolve_request_id(hdr.get(b"x-request-id", ""))
+        state["request_id"] = request_id
+
+        async def send_with_request_id(message: Message) -> None:
+            # GATE-7: 所有响应（包括错误和二进制下载）必须包含X-Request-Id
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-Id"] = request_id
+            await send(message)
+
+        path = scope["path"]
+        if path not in EXEMPT_PATHS:
+            # 2. Identity
+            device_id = hdr.get(b"x-device-id", "")
+            if not is_valid_device_id(device_id):
+                response = Response(
+                    content=INVALID_DEVICE_ID_BODY,
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    media_type="application/json"
+                )
+                await response(scope, receive, send_with_request_id)
+                return
+            state["device_id"] = device_id
+            state["user_id"] = device_id
+
+            # 3. Rate Limit
+            endpoint_key = match_endpoint_key(scope["method"], path)
+            state["endpoint_key"] = endpoint_key
+            if endpoint_key is not None:
+                limit = RATE_LIMIT_RULES[endpoint_key]
+                current_time = time.time()
+                if not _rate_limiter.acquire(device_id, endpoint_key, limit, current_time):
+                    response = build_rate_limited_response(limit, current_time)
+                    await response(scope, receive, send_with_request_id)
+                    return
+
+        await self.app(scope, receive, send_with_request_id)
@@ -0,0 +1,58 @@
+"""请求头缓存中间件：一次扫描scope["headers"]，下游中间件共享结果"""
+
+from typing import Dict
+
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# 下游中间件会读取的header（ASGI header名已是小写bytes）
+CACHED_HEADERS = frozenset({
+    b"content-type",
+    b"x-api-key",
+    b"x-device-id",
+    b"x-idempotency-key",
+    b"x-request-id",
+})
+
+
+def scan_headers(scope: Scope) -> Dict[bytes, str]:
+    """Return request.state.hdr, scanning scope["headers"] once if not yet cached."""
+    state = scope.setdefault("state", {})
+    hdr = state.get("hdr")
+    if hdr is None:
+        hdr = {}
+        for key, value in scope["headers"]:
+            if key in CACHED_HEADERS and key not in hdr:
+                hdr[key] = value.decode("latin-1")
+        state["hdr"] = hdr
+    return hdr
+
+
+def cached_header(conn: HTTPConnection, name: bytes, default: str = "") -> str:
+    """
+    Read a header cached by HeaderCacheMiddleware.
+
+    Falls back to conn.headers when the middleware is not mounted (e.g. an app
+    built in a unit test with a single middleware).
+    """
+    hdr = conn.scope.get("state", {}).get("hdr")
+    if hdr is None:
+        return conn.headers.get(name.decode("latin-1"), default)
+    return hdr.get(name, default)
+
+
+class HeaderCacheMiddleware:
+    """
+    Pure ASGI: walks scope["headers"] once per request and stores the
+    CACHED_HEADERS values (decoded like Starlette's Headers, first occurrence
+    wins) in request.state.hdr, so each BaseHTTPMiddleware layer does a dict
+    probe instead of rescanning the header list through a fresh Headers object.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            scan_headers(scope)
+        await self.app(scope, receive, send)
@@ -1,22 +1,173 @@
 from __future__ import annotations
 
-from typing import Awaitable, Callable, Optional
+from typing import Awaitable, Callable, Optional, Protocol
+import functools
 import hashlib
+import hmac
 import json
+import struct
 import time
+from collections import OrderedDict
 
 from fastapi import Request, Response, status
-from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
-from app.api.contract import APIError, APIErrorCode, APIResponse, compute_payload_hash
+from app.api.contract import APIErrorCode, compute_payload_digest, render_error_envelope
 from app.api.contract_constants import APIContractConstants
+from app.core.config import settings
+from app.middleware.header_cache import cached_header
+
+_CacheEntry = tuple[bytes, bytes, int, float]
+
+
+class _IdempotencyCache:
+    """
+    Bounded LRU with lazy TTL (IDEMPOTENCY_KEY_TTL_HOURS).
+
+    Expired entries are dropped when looked up; the least recently used entry
+    is evicted once max_entries is reached, so memory stays bounded no matter
+    how many distinct keys arrive. Only touched from the event loop thread
+    (dispatch never awaits between a lookup and its OrderedDict update), so
+    no lock is needed.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+
+    def get(self, key: str) -> Optional[_CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[3] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __setitem__(self, key: str, entry: _CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
 
 # In-memory cache: scope is enforced by cache_key construction.
-# value: (payload_hash, stored_response_json, status_code, stored_at_epoch)
-_idempotency_cache: dict[str, tuple[str, dict, int, float]] = {}
+# value: (payload_digest, stored_response_body, status_code, stored_at_epoch)
+# The body is kept as the raw JSON bytes the handler produced, so a replay
+# re-sends them without a parse/re-encode round trip.
+_idempotency_cache = _IdempotencyCache(
+    max_entries=settings.idempotency_cache_max_entries,
+    ttl_seconds=APIContractConstants.IDEMPOTENCY_KEY_TTL_HOURS * 3600,
+)
+
+# (payload_digest, stored_response_body, status_code)
+_StoredResponse = tuple[bytes, bytes, int]
+
+
+class IdempotencyStore(Protocol):
+    """Idempotency record storage; cache_key already carries the full scope."""
+
+    async def get(self, key: str) -> Optional[_StoredResponse]:
+        """Return the stored record for key, or None if absent/expired."""
+        ...
+
+    async def set(self, key: str, payload_digest: bytes, body: bytes, status_code: int) -> None:
+        """Store a record unless one already exists (first writer wins)."""
+        ...
+
+
+class InMemoryIdempotencyStore:
+    """Process-local store; correct only with a single worker process."""
+
+    def __init__(self, cache: _IdempotencyCache) -> None:
+        self.cache = cache
+
+    async def get(self, key: str) -> Optional[_StoredResponse]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        return entry[0], entry[1], entry[2]
+
+    async def set(self, key: str, payload_digest: bytes, body: bytes, status_code: int) -> None:
+        if self.cache.get(key) is None:
+            self.cache[key] = (payload_digest, body, status_code, time.time())
+
+
+class RedisIdempotencyStore:
+    """
+    Store shared by every worker/instance (IDEMPOTENCY_BACKEND=redis).
+
+    Records are written with SET NX EX, so two workers racing on the same key
+    cannot overwrite each other and expiry is enforced by Redis itself.
+    Value layout: 32-byte payload digest | 2-byte status (big-endian) | body.
+    """
+
+    KEY_PREFIX = "idem:"
+    _HEADER = struct.Struct(">32sH")
 
+    def __init__(self, url: str, ttl_seconds: int) -> None:
+        # Optional dependency: only needed when this backend is selected
+        import redis.asyncio as redis_asyncio
 
+        self.client = redis_asyncio.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, key: str) -> Optional[_StoredResponse]:
+        raw = await self.client.get(self.KEY_PREFIX + key)
+        if raw is None:
+            return None
+        payload_digest, status_code = self._HEADER.unpack_from(raw)
+        return payload_digest, raw[self._HEADER.size:], status_code
+
+    async def set(self, key: str, payload_digest: bytes, body: bytes, status_code: int) -> None:
+        value = self._HEADER.pack(payload_digest, status_code) + body
+        await self.client.set(self.KEY_PREFIX + key, value, ex=self.ttl_seconds, nx=True)
+
+
+def create_idempotency_store(backend: str = "memory") -> IdempotencyStore:
+    """
+    Create idempotency store.
+
+    Args:
+        backend: "memory" or "redis"
+
+    Returns:
+        IdempotencyStore instance
+    """
+    if backend == "memory":
+        return InMemoryIdempotencyStore(_idempotency_cache)
+    elif backend == "redis":
+        return RedisIdempotencyStore(
+            settings.idempotency_redis_url,
+            ttl_seconds=APIContractConstants.IDEMPOTENCY_KEY_TTL_HOURS * 3600,
+        )
+    else:
+        raise ValueError(f"Unknown idempotency backend: {backend}")
+
+
+_idempotency_store: IdempotencyStore = create_idempotency_store(settings.idempotency_backend)
+
+# Fixed error envelopes, rendered once at import
+_MISSING_USER_IDENTITY_BODY = render_error_envelope(APIErrorCode.INVALID_REQUEST, "Missing user identity")
+_PAYLOAD_MISMATCH_BODY = render_error_envelope(
+    APIErrorCode.STATE_CONFLICT, "Idempotency key reuse with different payload (payload mismatch)"
+)
+
+
+# Paths carry upload/job ids, so the set is not tiny; 1024 bounds the memo
+# while still covering the ids a client is actively retrying against.
+@functools.lru_cache(maxsize=1024)
 def _canonicalize_path(path: str) -> str:
     if path != "/" and path.endswith("/"):
         return path[:-1]
@@ -40,7 +191,7 @@ def _build_cache_key(user_id: str, method: str, path: str, idempotency_key: str)
     return f"{user_id}:{method}:{canonical_path}:{idempotency_key}"
 
 
-def resolve_user_id_or_400(request: Request) -> tuple[str, Optional[JSONResponse]]:
+def resolve_user_id_or_400(request: Request) -> tuple[str, Optional[Response]]:
     """
     MUST NOT skip. Resolve identity deterministically.
     Order:
@@ -55,18 +206,12 @@ def resolve_user_id_or_400(request: Request) -> tuple[str, Optional[JSONResponse
     """
     user_id = getattr(request.state, "user_id", None)
     if not user_id:
-        user_id = request.headers.get("X-Device-Id")
+        user_id = cached_header(request, b"x-device-id")
     if not user_id:
-        error_response = APIResponse(
-            success=False,
-            error=APIError(
-                code=APIErrorCode.INVALID_REQUEST,
-                message="Missing user identity"
-            )
-        )
-        return None, JSONResponse(
+        return None, Response(
+            content=_MISSING_USER_IDENTITY_BODY,
             status_code=status.HTTP_400_BAD_REQUEST,
-            content=error_response.model_dump(exclude_none=True)
+            media_type="application/json"
         )
     request.state.user_id = user_id
     return user_id, None
@@ -78,6 +223,14 @@ class IdempotencyMiddleware(BaseHTTPMiddleware):
         if request.method not in ("POST", "PUT", "PATCH"):
             return await call_next(request)
 
+        # Extract idempotency_key: header preferred, then JSON body fallback
+        idempotency_key: Optional[str] = cached_header(request, b"x-idempotency-key") or None
+        content_type = cached_header(request, b"content-type")
+        if not idempotency_key and content_type and "json" not in content_type:
+            # No header and a declared non-JSON body cannot carry the key: never buffer
+            # it (chunk PATCHes stream up to 5MB of octet-stream straight to the handler)
+            return await call_next(request)
+
         # Read body ONCE (Starlette caches request.body())
         body_bytes: bytes = b""
         try:
@@ -85,15 +238,18 @@ class IdempotencyMiddleware(BaseHTTPMiddleware):
         except Exception:
             body_bytes = b""
 
-        # Extract idempotency_key: header preferred, then JSON body fallback
-        idempotency_key: Optional[str] = request.headers.get("X-Idempotency-Key")
-        if not idempotency_key and body_bytes:
+        # Parse ONCE: the same dict supplies the key fallback and the payload hash
+        body_dict: Optional[dict] = None
+        if body_bytes:
             try:
-                body_dict = json.loads(body_bytes)
-                if isinstance(body_dict, dict):
-                    idempotency_key = body_dict.get("idempotency_key")
+                parsed = json.loads(body_bytes)
+                if isinstance(parsed, dict):
+                    body_dict = parsed
             except Exception:
-                idempotency_key = None
+                body_dict = None
+
+        if not idempotency_key and body_dict is not None:
+            idempotency_key = body_dict.get("idempotency_key")
 
         # If no idempotency requested, proceed normally
         if not idempotency_key:
@@ -105,43 +261,29 @@ class IdempotencyMiddleware(BaseHTTPMiddleware):
             return error_response
 
         # Scope: (user_id, method, canonical_path, key)
-        cache_key = _build_cache_key(user_id, request.method, request.url.path, idempotency_key)
+        # scope["path"] is what request.url.path parses back out, without building a URL
+        cache_key = _build_cache_key(user_id, request.method, request.scope["path"], idempotency_key)
 
         # Compute payload hash (existing contract helper)
-        # PR1E: parse JSON dict first, fallback to raw bytes hash for non-JSON/non-dict
-        if body_bytes:
-            try:
-                body_dict = json.loads(body_bytes)
-                if isinstance(body_dict, dict):
-                    payload_hash = compute_payload_hash(body_dict)
-                else:
-                    # Non-dict JSON (array, string, etc.) - hash raw bytes
-                    payload_hash = hashlib.sha256(body_bytes).hexdigest()
-            except (json.JSONDecodeError, ValueError, TypeError):
-                # Non-JSON body - hash raw bytes
-                payload_hash = hashlib.sha256(body_bytes).hexdigest()
+        # PR1E: JSON dict → canonical hash; non-JSON/non-dict/empty → raw bytes hash
+        # Raw 32-byte digests: half the cache footprint of hex, no hex encoding
+        if body_dict is not None:
+            payload_digest = compute_payload_digest(body_dict)
         else:
-            # Empty body
-            payload_hash = hashlib.sha256(b"").hexdigest()
+            payload_digest = hashlib.sha256(body_bytes).digest()
 
         # Check cache
-        cached = _idempotency_cache.get(cache_key)
+        cached = await _idempotency_store.get(cache_key)
         if cached is not None:
-            cached_hash, cached_body, cached_status, _ts = cached
-            if cached_hash != payload_hash:
+            cached_digest, cached_body, cached_status = cached
+            if not hmac.compare_digest(cached_digest, payload_digest):
                 # Same key, different payload => 409 STATE_CONFLICT
-                error_response = APIResponse(
-                    success=False,
-                    error=APIError(
-                        code=APIErrorCode.STATE_CONFLICT,
-                        message="Idempotency key reuse with different payload (payload mismatch)",
-                    )
-                )
-                return JSONResponse(
+                return Response(
+                    content=_PAYLOAD_MISMATCH_BODY,
                     status_code=status.HTTP_409_CONFLICT,
-                    content=error_response.model_dump(exclude_none=True)
+                    media_type="application/json"
                 )
-            return JSONResponse(status_code=cached_status, content=cached_body)
+            return Response(content=cached_body, status_code=cached_status, media_type="application/json")
 
         # Execute request
         response = await call_next(request)
@@ -150,13 +292,12 @@ class IdempotencyMiddleware(BaseHTTPMiddleware):
         if response.status_code in (200, 201):
             try:
                 # Starlette Response may not have .body; ensure we read iterator safely
-                raw = b""
-                async for chunk in response.body_iterator:
-                    raw += chunk
+                raw = b"".join([chunk async for chunk in response.body_iterator])
 
                 # Attempt to parse JSON body for caching. If not JSON, skip caching safely.
+                # (json.loads takes bytes directly; the parse only validates cacheability)
                 try:
-                    parsed = json.loads(raw.decode("utf-8")) if raw else {}
+                    parsed = json.loads(raw) if raw else {}
                     if not isinstance(parsed, dict):
                         # Only cache dict-like APIResponse envelopes
                         return Response(
@@ -168,10 +309,12 @@ class IdempotencyMiddleware(BaseHTTPMiddleware):
                     )
 
                 # Cache
-                _idempotency_cache[cache_key] = (payload_hash, parsed, response.status_code, time.time())
+                await _idempotency_store.set(cache_key, payload_digest, raw or b"{}", response.status_code)
 
                 # Return the rebuilt response (because body_iterator already consumed)
-                return JSONResponse(status_code=response.status_code, content=parsed, headers=dict(response.headers))
+                return Response(
+                    content=raw, status_code=response.status_code, headers=dict(response.headers), media_type=response.media_type
+                )
             except Exception:
                 # Fail-open: do not break success path
                 return response
@@ -2,22 +2,16 @@
 # Stage: WHITEBOX | Camera-only
 # Endpoints: 12 | HTTP Codes: 10 (3 success + 7 error) | Business Errors: 7
 
-"""限流中间件（基于X-Device-Id，PATCH-1）"""
+"""限流规则与令牌桶（基于X-Device-Id，PATCH-1），由GatewayMiddleware调用"""
 
-import time
-from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, Optional, Tuple
 
-from fastapi import Request, status
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
+from fastapi.responses import Response
 
-from app.api.contract import APIError, APIErrorCode, APIResponse
+from app.api.contract import APIErrorCode, render_error_envelope
 from app.api.contract_constants import APIContractConstants
 
-# GATE-8: /health端点豁免
-EXEMPT_PATHS = ["/v1/health"]
-
 # 端点限流规则（次/分钟）
 RATE_LIMIT_RULES: Dict[str, int] = {
     "POST /v1/uploads": APIContractConstants.RATE_LIMIT_UPLOADS_PER_MINUTE,
@@ -28,87 +22,76 @@ RATE_LIMIT_RULES: Dict[str, int] = {
     "GET /v1/artifacts": APIContractConstants.RATE_LIMIT_QUERIES_PER_MINUTE,
 }
 
+# (method, "/v1/<resource>") -> 限流key；POST /v1/jobs/{id}/cancel 在查表后单独处理
+_ENDPOINT_TABLE: Dict[Tuple[str, str], str] = {
+    ("POST", "/v1/uploads"): "POST /v1/uploads",
+    ("PATCH", "/v1/uploads"): "PATCH /v1/uploads",
+    ("POST", "/v1/jobs"): "POST /v1/jobs",
+    ("GET", "/v1/jobs"): "GET /v1/jobs",
+    ("GET", "/v1/artifacts"): "GET /v1/artifacts",
+}
+
+RATE_LIMIT_WINDOW_SECONDS = 60  # 1分钟窗口
+
+# 429信封固定（retry_after = 窗口长度）：import时渲染一次
+_RATE_LIMITED_BODY = render_error_envelope(
+    APIErrorCode.RATE_LIMITED,
+    "Too many requests",
+    details={"retry_after": str(RATE_LIMIT_WINDOW_SECONDS)}
+)
+
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """限流中间件（基于X-Device-Id，PATCH-1）"""
+def match_endpoint_key(method: str, path: str) -> Optional[str]:
+    """获取端点限流key（一次split + 一次查表）；不限流的端点返回None"""
+    parts = path.split("/", 3)  # ["", "v1", "<resource>", rest...]
+    if len(parts) < 3:
+        return None
+    endpoint_key = _ENDPOINT_TABLE.get((method, "/" + parts[1] + "/" + parts[2]))
+    if endpoint_key == "POST /v1/jobs" and path.endswith("/cancel"):
+        return "POST /v1/jobs/cancel"
+    return endpoint_key
+
+
+class TokenBucketLimiter:
+    """
+    令牌桶：容量=limit，按 limit/窗口 的速率连续补充。
+
+    (device_id, endpoint) -> (tokens, last_refill_ts)：每个key固定两个数，与请求量无关
+    """
     
-    def __init__(self, app):
-        super().__init__(app)
-        # device_id -> endpoint -> [timestamps]
-        self.request_counts: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    def __init__(self) -> None:
+        self.buckets: Dict[Tuple[str, str], Tuple[float, float]] = {}
     
-    def _get_endpoint_key(self, request: Request) -> str:
-        """获取端点限流key"""
-        method = request.method
-        path = request.url.path
+    def acquire(self, device_id: str, endpoint_key: str, limit: int, current_time: float) -> bool:
+        """消耗一个令牌；桶空时返回False（调用方回429）"""
+        bucket_key = (device_id, endpoint_key)
+        bucket = self.buckets.get(bucket_key)
+        if bucket is None:
+            tokens = float(limit)
+        else:
+            tokens, last_refill_ts = bucket
+            tokens = min(float(limit), tokens + (current_time - last_refill_ts) * (limit / RATE_LIMIT_WINDOW_SECONDS))
         
-        # 匹配端点模式
-        if path.startswith("/v1/uploads") and method == "POST":
-            return "POST /v1/uploads"
-        elif path.startswith("/v1/uploads") and method == "PATCH":
-            return "PATCH /v1/uploads"
-        elif path.startswith("/v1/jobs") and method == "POST":
-            if path.endswith("/cancel"):
-                return "POST /v1/jobs/cancel"
-            return "POST /v1/jobs"
-        elif path.startswith("/v1/jobs") and method == "GET":
-            return "GET /v1/jobs"
-        elif path.startswith("/v1/artifacts") and method == "GET":
-            return "GET /v1/artifacts"
+        if tokens < 1.0:
+            self.buckets[bucket_key] = (tokens, current_time)
+            return False
         
-        # 默认不限流
-        return None
+        self.buckets[bucket_key] = (tokens - 1.0, current_time)
+        return True
     
-    async def dispatch(self, request: Request, call_next):
-        # GATE-8: /health豁免
-        if request.url.path in EXEMPT_PATHS:
-            return await call_next(request)
-        
-        # 获取device_id（应该已经通过identity middleware设置）
-        device_id = getattr(request.state, "device_id", None)
-        if not device_id:
-            # 如果没有device_id，跳过限流（identity middleware会处理认证）
-            return await call_next(request)
-        
-        # 获取端点限流key
-        endpoint_key = self._get_endpoint_key(request)
-        if not endpoint_key or endpoint_key not in RATE_LIMIT_RULES:
-            # 不限流的端点
-            return await call_next(request)
-        
-        limit = RATE_LIMIT_RULES[endpoint_key]
-        window_seconds = 60  # 1分钟窗口
-        
-        # 清理旧记录
-        current_time = time.time()
-        cutoff_time = current_time - window_seconds
-        self.request_counts[device_id][endpoint_key] = [
-            ts for ts in self.request_counts[device_id][endpoint_key]
-            if ts > cutoff_time
-        ]
-        
-        # 检查限流
-        if len(self.request_counts[device_id][endpoint_key]) >= limit:
-            error_response = APIResponse(
-                success=False,
-                error=APIError(
-                    code=APIErrorCode.RATE_LIMITED,
-                    message="Too many requests",
-                    details={"retry_after": str(window_seconds)}
-                )
-            )
-            response = JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content=error_response.model_dump(exclude_none=True)
-            )
-            # 添加限流headers
-            response.headers["Retry-After"] = str(window_seconds)
-            response.headers["X-RateLimit-Limit"] = str(limit)
-            response.headers["X-RateLimit-Remaining"] = "0"
-            response.headers["X-RateLimit-Reset"] = str(int(current_time + window_seconds))
-            return response
-        
-        # 记录请求
-        self.request_counts[device_id][endpoint_key].append(current_time)
-        
-        return await call_next(request)
+    def clear(self) -> None:
+        self.buckets.clear()
+
+
+def build_rate_limited_response(limit: int, current_time: float) -> Response:
+    """429 RATE_LIMITED（固定信封 + 限流headers）"""
+    response = Response(
+        content=_RATE_LIMITED_BODY,
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        media_type="application/json"
+    )
+    response.headers["Retry-After"] = str(RATE_LIMIT_WINDOW_SECONDS)
+    response.headers["X-RateLimit-Limit"] = str(limit)
+    response.headers["X-RateLimit-Remaining"] = "0"
+    response.headers["X-RateLimit-Reset"] = str(int(current_time + RATE_LIMIT_WINDOW_SECONDS))
+    return response
@@ -1,42 +1,48 @@
 # PR1E — API Contract Hardening Patch
 # Request-Id Forwarding (Strict Validation + Always Present)
 
-"""Request-Id中间件（GATE-7 + PR1E严格验证）"""
+"""Request-Id生成与校验（GATE-7 + PR1E严格验证），由GatewayMiddleware调用"""
 
+import itertools
+import os
 import re
-import uuid
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+import secrets
 
 # PR1E: X-Request-Id格式严格验证：^[A-Za-z0-9_-]{8,64}$
 # 最小8字符，最大64字符，只允许字母、数字、下划线、连字符
-REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
-
-
-class RequestIdMiddleware(BaseHTTPMiddleware):
-    """Request-Id处理中间件（GATE-7）"""
-    
-    async def dispatch(self, request: Request, call_next):
-        # 获取客户端传入的X-Request-Id
-        client_request_id = request.headers.get("X-Request-Id", "")
-        
-        # 格式校验
-        if client_request_id and REQUEST_ID_PATTERN.match(client_request_id):
-            request_id = client_request_id
-        else:
-            # 格式非法或未提供，生成新ID
-            request_id = f"req_{uuid.uuid4().hex[:16]}"
-        
-        # 存储到request state
-        request.state.request_id = request_id
-        
-        # 调用下一个中间件/处理器
-        response = await call_next(request)
-        
-        # GATE-7: 所有响应（包括错误和二进制下载）必须包含X-Request-Id
-        if isinstance(response, Response):
-            response.headers["X-Request-Id"] = request_id
-        
-        return response
+# fullmatch + re.ASCII：不接受末尾换行，字符类不走Unicode分支
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{8,64}', re.ASCII)
+REQUEST_ID_MIN_LENGTH = 8
+REQUEST_ID_MAX_LENGTH = 64
 
+# 服务端生成的ID：req_ + 12位进程随机前缀 + 10位十六进制计数器（共26字符）
+# 每个进程启动时读一次urandom，之后每个请求只是next()，无syscall、无UUID对象
+_REQUEST_ID_PREFIX = "req_" + secrets.token_hex(6)
+_REQUEST_ID_COUNTER = itertools.count()
+
+
+def _reset_after_fork() -> None:
+    # 预加载后fork的worker必须换前缀，否则各worker会生成相同的ID序列
+    global _REQUEST_ID_PREFIX, _REQUEST_ID_COUNTER
+    _REQUEST_ID_PREFIX = "req_" + secrets.token_hex(6)
+    _REQUEST_ID_COUNTER = itertools.count()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def generate_request_id() -> str:
+    """生成服务端X-Request-Id（进程内单调、唯一；满足REQUEST_ID_PATTERN）"""
+    return f"{_REQUEST_ID_PREFIX}{next(_REQUEST_ID_COUNTER):010x}"
+
+
+def resolve_request_id(client_request_id: str) -> str:
+    """合法的客户端X-Request-Id原样回传；缺失或格式非法 → 生成新ID"""
+    # 长度越界的直接跳过正则
+    if (
+        REQUEST_ID_MIN_LENGTH <= len(client_request_id) <= REQUEST_ID_MAX_LENGTH
+        and REQUEST_ID_PATTERN.fullmatch(client_request_id)
+    ):
+        return client_request_id
+    return generate_request_id()
@@ -4,60 +4,112 @@
 
 """请求大小强制中间件（PATCH-8）"""
 
-from fastapi import Request, status
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
+from fastapi.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.api.contract import APIError, APIErrorCode, APIResponse
+from app.api.contract import APIErrorCode, render_error_envelope
 from app.api.contract_constants import APIContractConstants
 
+# 固定错误信封：import时渲染一次
+_HEADER_TOO_LARGE_BODY = render_error_envelope(APIErrorCode.INVALID_REQUEST, "Request header too large")
+_INVALID_CONTENT_LENGTH_BODY = render_error_envelope(APIErrorCode.INVALID_REQUEST, "Invalid Content-Length")
+_BODY_TOO_LARGE_BODY = render_error_envelope(APIErrorCode.PAYLOAD_TOO_LARGE, "Request body too large")
+
+
+async def _send_error(scope: Scope, receive: Receive, send: Send, status_code: int, body: bytes) -> None:
+    response = Response(content=body, status_code=status_code, media_type="application/json")
+    await response(scope, receive, send)
+
+
+class RequestSizeMiddleware:
+    """
+    请求大小强制中间件（PATCH-8）
+
+    Pure ASGI (not BaseHTTPMiddleware) so the limits apply to the raw receive()
+    stream before any layer buffers the body:
+    - Header > MAX_HEADER_SIZE_BYTES → 400 INVALID_REQUEST
+    - Declared Content-Length over the cap → 413 before a single body byte is read
+    - Bodies without (or lying about) Content-Length are counted as they stream;
+      the first byte past the cap ends the request with 413
+    Cap: MAX_JSON_BODY_SIZE_BYTES for application/json, otherwise
+    MAX_CHUNK_SIZE_BYTES (the largest body any endpoint accepts).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-class RequestSizeMiddleware(BaseHTTPMiddleware):
-    """请求大小强制中间件（PATCH-8）"""
-    
-    async def dispatch(self, request: Request, call_next):
         # PATCH-8: Header大小检查（8KB → 400 INVALID_REQUEST）
-        header_size = sum(
-            len(key.encode('utf-8')) + len(value.encode('utf-8')) + 4  # +4 for ": \r\n"
-            for key, value in request.headers.items()
-        )
-        
-        if header_size > APIContractConstants.MAX_HEADER_SIZE_BYTES:
-            error_response = APIResponse(
-                success=False,
-                error=APIError(
-                    code=APIErrorCode.INVALID_REQUEST,
-                    message="Request header too large"
-                )
-            )
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content=error_response.model_dump(exclude_none=True)
-            )
-        
+        # scope["headers"]已是原始bytes，直接len()，无需encode；超限即停止扫描
+        max_header_size = APIContractConstants.MAX_HEADER_SIZE_BYTES
+        header_size = 0
+        content_type = b""
+        content_length = None
+        for key, value in scope["headers"]:
+            header_size += len(key) + len(value) + 4  # +4 for ": \r\n"
+            if header_size > max_header_size:
+                await _send_error(scope, receive, send, status.HTTP_400_BAD_REQUEST, _HEADER_TOO_LARGE_BODY)
+                return
+            if key == b"content-type":
+                content_type = value
+            elif key == b"content-length":
+                content_length = value
+
         # PATCH-8: JSON body大小检查（64KB → 413 PAYLOAD_TOO_LARGE）
-        # 仅对application/json检查
-        content_type = request.headers.get("content-type", "")
-        if content_type.startswith("application/json"):
-            # 读取body检查大小
-            body = await request.body()
-            if len(body) > APIContractConstants.MAX_JSON_BODY_SIZE_BYTES:
-                error_response = APIResponse(
-                    success=False,
-                    error=APIError(
-                        code=APIErrorCode.PAYLOAD_TOO_LARGE,
-                        message="Request body too large"
-                    )
-                )
-                return JSONResponse(
-                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    content=error_response.model_dump(exclude_none=True)
+        if content_type.startswith(b"application/json"):
+            limit = APIContractConstants.MAX_JSON_BODY_SIZE_BYTES
+        else:
+            limit = APIContractConstants.MAX_CHUNK_SIZE_BYTES
+
+        # Early reject on the declared length: no body byte is read or buffered
+        if content_length is not None:
+            if not content_length.isdigit():
+                await _send_error(scope, receive, send, status.HTTP_400_BAD_REQUEST, _INVALID_CONTENT_LENGTH_BODY)
+                return
+            if int(content_length) > limit:
+                await _send_error(
+                    scope, receive, send, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, _BODY_TOO_LARGE_BODY
                 )
-            
-            # 重新创建request body（已被消费）
-            async def receive():
-                return {"type": "http.request", "body": body}
-            request._receive = receive
-        
-        return await call_next(request)
+                return
+
+        # Streaming guard: counts body bytes as the app (or an inner middleware) pulls them
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                return  # 413 already sent; drop whatever the app answers after the disconnect
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        async def receive_wrapper() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    if not response_started:
+                        await _send_error(
+                            scope, receive, send, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, _BODY_TOO_LARGE_BODY
+                        )
+                    rejected = True
+                    # The app sees a client disconnect and stops reading
+                    return {"type": "http.disconnect"}
+            return message
 
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except Exception:
+            if not rejected:
+                raise
+            # The app failed on the synthetic disconnect; the 413 is already out
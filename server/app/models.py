@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 from sqlalchemy import Column, DateTime, Integer, String, Text, ForeignKey, Index
@@ -28,7 +28,18 @@ class UploadSession(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # 关系
-    chunks = relationship("Chunk", back_populates="upload_session", cascade="all, delete-orphan")
+    # WHY lazy="select" (not selectin): every chunk PATCH loads the session; an
+    # eager collection would pull all N chunk rows per request. Chunk state is
+    # read via targeted queries (_STMT_CHUNK_INDICES / COUNT) instead.
+    # WHY passive_deletes: 删除会话时由数据库ON DELETE CASCADE删chunk，ORM不再逐行加载+DELETE（N+1）
+    chunks = relationship(
+        "Chunk", back_populates="upload_session", cascade="all, delete-orphan", lazy="select", passive_deletes=True
+    )
+    
+    # 并发限制查询：(user_id, status) 复合索引，不扫该用户全部历史会话
+    __table_args__ = (
+        Index('ix_upload_sessions_user_status', 'user_id', 'status'),
+    )
     
     def __repr__(self):
         return f"<UploadSession(id={self.id}, status={self.status})>"
@@ -39,7 +50,7 @@ class Chunk(Base):
     __tablename__ = "chunks"
     
     id = Column(String, primary_key=True)
-    upload_id = Column(String, ForeignKey("upload_sessions.id"), nullable=False, index=True)
+    upload_id = Column(String, ForeignKey("upload_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
     chunk_index = Column(Integer, nullable=False)
     chunk_hash = Column(String, nullable=False)
     stored_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -85,8 +96,28 @@ class Job(Base):
     status = Column(String, nullable=True)  # Legacy: use state instead
     
     # 关系
-    artifact = relationship("Artifact", back_populates="job", uselist=False)
-    timeline_events = relationship("TimelineEvent", back_populates="job", cascade="all, delete-orphan")
+    # WHY lazy="select": get/list/cancel read the artifact_id column, and the
+    # timeline endpoint queries TimelineEvent directly, so no handler touches
+    # these per row; a default joined/selectin load would add a JOIN or a second
+    # SELECT to every Job query for nothing. Code that iterates Jobs and needs
+    # them must opt in with .options(joinedload(Job.artifact)) /
+    # .options(selectinload(Job.timeline_events)).
+    # WHY passive_deletes: 子行由数据库ON DELETE CASCADE删除，删Job不加载artifact/timeline
+    artifact = relationship(
+        "Artifact", back_populates="job", uselist=False, cascade="all, delete-orphan", lazy="select",
+        passive_deletes=True,
+    )
+    timeline_events = relationship(
+        "TimelineEvent", back_populates="job", cascade="all, delete-orphan", lazy="select", passive_deletes=True
+    )
+    
+    # 热查询复合索引：
+    # - 去重（INV-U21）：user_id = ? AND bundle_hash = ? AND state IN (...) → 单次B-tree seek
+    # - 任务列表：user_id = ? ORDER BY created_at DESC LIMIT → 按索引顺序读取，无需排序
+    __table_args__ = (
+        Index('ix_jobs_user_bundle_state', 'user_id', 'bundle_hash', 'state'),
+        Index('ix_jobs_user_created', 'user_id', 'created_at'),
+    )
     
     def __repr__(self):
         return f"<Job(id={self.id}, state={self.state})>"
@@ -97,7 +128,7 @@ class Artifact(Base):
     __tablename__ = "artifacts"
     
     id = Column(String, primary_key=True)
-    job_id = Column(String, ForeignKey("jobs.id"), nullable=False, index=True)
+    job_id = Column(String, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
     format = Column(String, nullable=False)  # "splat"
     size = Column(Integer, nullable=False)
     hash = Column(String, nullable=False, index=True)
@@ -117,7 +148,7 @@ class TimelineEvent(Base):
     __tablename__ = "timeline_events"
     
     id = Column(String, primary_key=True)
-    job_id = Column(String, ForeignKey("jobs.id"), nullable=False, index=True)
+    job_id = Column(String, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
     timestamp = Column(DateTime(timezone=True), nullable=False, index=True)
     from_state = Column(String, nullable=True)
     to_state = Column(String, nullable=False)
@@ -144,6 +175,9 @@ class Asset(Base):
 
 
 # Pydantic Models for API (camelCase)
+# Trust boundary: *Request models are client input and always validated;
+# responses built from our own ORM rows (already typed by the columns) use
+# model_construct() and skip pydantic-core validation.
 class AssetResponse(BaseModel):
     assetId: str
     
@@ -165,12 +199,21 @@ class CreateJobResponse(BaseModel):
         populate_by_name = True
 
 
+# Closed value sets: validated by a literal membership check and spelled out in
+# the generated schema. Job states mirror jobs/job_state.py JobState (9 states).
+JobStatusLiteral = Literal[
+    "pending", "uploading", "queued", "processing", "packaging",
+    "completed", "failed", "cancelled", "capacity_saturated",
+]
+ArtifactFormatLiteral = Literal["ply", "splat"]
+
+
 class JobStatusResponse(BaseModel):
     jobId: str
-    status: str
+    status: JobStatusLiteral
     progress: Optional[float] = None
     artifactPath: Optional[str] = None
-    artifactFormat: Optional[str] = None
+    artifactFormat: Optional[ArtifactFormatLiteral] = None
     errorMessage: Optional[str] = None
     
     class Config:
@@ -203,7 +246,7 @@ class JobStatusResponse(BaseModel):
         
         error_message = job.error_message or job.failure_reason
         
-        return cls(
+        return cls.model_construct(
             jobId=job.id,
             status=status,
             progress=progress_float,
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Callable, Optional, Protocol, Tuple
 
@@ -10,10 +10,19 @@ class ProgressUpdate:
     
     Guarantees monotonic semantics: percent and stage must never go backwards.
     """
+    # Created on every progress callback: no per-instance __dict__.
+    # Declared by hand (no field defaults) so it works without dataclass(slots=True).
+    __slots__ = ("percent", "stage", "message", "ts_ns")
+    
     percent: Optional[float]  # 0.0 to 100.0, or None if not available
     stage: str  # Stage identifier: "sfm", "train", "export", etc.
     message: str  # Human-readable message (max 512 chars)
-    ts: datetime  # Server time, timezone-aware
+    ts_ns: int  # Server time, ns since the Unix epoch (time.time_ns())
+    
+    @property
+    def ts(self) -> datetime:
+        """Server time as a timezone-aware UTC datetime (built only when read)."""
+        return datetime.fromtimestamp(self.ts_ns / 1e9, tz=timezone.utc)
     
     def __post_init__(self):
         """Validate progress update."""
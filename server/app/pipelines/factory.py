@@ -1,10 +1,14 @@
+import functools
+
 from app.pipelines.dummy import DummyPipeline
 from app.pipelines.nerfstudio import NerfstudioPipeline
 
 
+# Pipelines hold no per-job state, so one instance per type is shared
+@functools.lru_cache(maxsize=4)
 def create_pipeline(pipeline_type: str = "dummy"):
     """
-    Create pipeline instance.
+    Create pipeline instance (cached per pipeline_type).
     
     Args:
         pipeline_type: "dummy" or "nerfstudio"
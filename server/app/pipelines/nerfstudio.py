@@ -1,9 +1,11 @@
 import asyncio
+import errno
+import os
 import re
 import shutil
-from datetime import datetime, timezone
+import time
 from pathlib import Path
-from typing import Callable, Optional, Tuple
+from typing import Callable, List, Optional, Tuple
 
 from app.core.errors import ProcessingFailedError, TimeoutError
 from app.core.storage import ensure_directory, remove_file
@@ -19,17 +21,44 @@ EXPORT_WEIGHT = 5.0  # Model export
 SFM_TIMEOUT_SECONDS = 1800  # 30 minutes for SfM
 TRAINING_TIMEOUT_SECONDS = 3600  # 60 minutes for training
 EXPORT_TIMEOUT_SECONDS = 300  # 5 minutes for export
+PARSER_DRAIN_TIMEOUT_SECONDS = 5.0  # stderr parsing allowed after the process exits
+STDERR_READ_BYTES = 65536  # per read() from the subprocess stderr pipe
+# StreamReader limit: the pipe transport pauses reading once 2× this is buffered;
+# 1 MiB (vs the 64 KiB default) keeps log bursts flowing while the parser catches up
+STDERR_STREAM_LIMIT = 1 << 20
+
+# Progress emit throttle (report_monotonic)
+PROGRESS_MIN_DELTA_PERCENT = 0.1
+PROGRESS_MIN_INTERVAL_SECONDS = 0.25
+# Training logs a "Step N/M" line per iteration: parse 1 in 32 (mask), SfM parses every line
+TRAIN_STEP_SAMPLE_MASK = 0x1F
 
 # Regex patterns for parsing nerfstudio output
-# SfM phase patterns
-RE_SFM_EXTRACT = re.compile(r"Feature extraction:\s*(\d+)/(\d+)", re.IGNORECASE)
-RE_SFM_MATCH = re.compile(r"Feature matching:\s*(\d+)/(\d+)", re.IGNORECASE)
-RE_SFM_RECONSTRUCT = re.compile(r"(?:registered|Registering image)\s+(?:#)?(\d+)\s*(?:\((\d+)\)|of\s+(\d+))?", re.IGNORECASE)
+# SfM phase patterns: extract / match / reconstruct fused into one alternation so
+# each stderr line is scanned once; m.lastgroup names the sub-stage that matched.
+# Compiled over bytes: raw stderr lines are matched directly, no per-line UTF-8 decode.
+# Groups: extract → 2, 3 | match → 5, 6 | reconstruct → 8, then 9 "(N)" or 10 "of N"
+RE_SFM_COMBINED = re.compile(
+    rb"(?P<extract>Feature extraction:\s*(\d+)/(\d+))"
+    rb"|(?P<match>Feature matching:\s*(\d+)/(\d+))"
+    rb"|(?P<reconstruct>(?:registered|Registering image)\s+(?:#)?(\d+)\s*(?:\((\d+)\)|of\s+(\d+))?)",
+    re.IGNORECASE,
+)
 # Training phase pattern — matches "Step 1000/30000" anywhere in line
-RE_TRAIN_STEP = re.compile(r"Step\s+(\d+)/(\d+)", re.IGNORECASE)
+# (bytes, like RE_SFM_COMBINED: int() takes the ASCII digit groups, no line decode)
+RE_TRAIN_STEP = re.compile(rb"Step\s+(\d+)/(\d+)", re.IGNORECASE)
 # COLMAP image registration (alternative format)
 RE_COLMAP_IMAGES = re.compile(r"Registering image #(\d+)\s+\((\d+)\)", re.IGNORECASE)
 
+# Literal prefilters (lower-cased, matching the IGNORECASE patterns): most stderr
+# lines are tqdm/rich chatter, and a C substring scan rejects them before any regex runs.
+# Every RE_SFM_COMBINED match contains "feature " or "regist"; every RE_TRAIN_STEP match "step".
+_SFM_MARKERS = (b"feature ", b"regist")
+_TRAIN_STEP_MARKER = b"step"
+
+# Line terminators on subprocess stderr: \n, and the bare \r of tqdm/rich redraws
+RE_LINE_END = re.compile(rb"[\r\n]")
+
 
 class NerfstudioPipeline:
     """Nerfstudio pipeline for processing video to 3DGS with real-time progress."""
@@ -55,24 +84,28 @@ class NerfstudioPipeline:
 
         def report(percent: Optional[float], stage: str, msg: str) -> None:
             """Report progress update with monotonicity guarantee."""
-            if on_progress is not None:
-                clamped_percent = None
-                if percent is not None:
-                    clamped_percent = max(0.0, min(100.0, percent))
-                update = ProgressUpdate(
-                    percent=clamped_percent,
-                    stage=stage,
-                    message=msg[:512],  # Enforce max length
-                    ts=datetime.now(timezone.utc),
-                )
-                on_progress(update)
+            clamped_percent = None
+            if percent is not None:
+                clamped_percent = max(0.0, min(100.0, percent))
+            update = ProgressUpdate(
+                percent=clamped_percent,
+                stage=stage,
+                message=msg if len(msg) <= 512 else msg[:512],  # Enforce max length
+                ts_ns=time.time_ns(),
+            )
+            on_progress(update)
 
         last_stage = None
         last_percent = None
+        last_emit_time = 0.0
+        last_emit_percent: Optional[float] = None
 
         def report_monotonic(percent: Optional[float], stage: str, msg: str) -> None:
-            """Report progress with monotonicity enforcement."""
-            nonlocal last_stage, last_percent
+            """Report progress with monotonicity enforcement and emit throttling."""
+            nonlocal last_stage, last_percent, last_emit_time, last_emit_percent
+            if on_progress is None:
+                # No consumer: skip ordering/throttle bookkeeping and the ProgressUpdate
+                return
 
             # Stage progression: sfm -> train -> export (never go backwards)
             stage_order = {"sfm": 0, "train": 1, "export": 2}
@@ -91,9 +124,24 @@ class NerfstudioPipeline:
                             return
 
             # Update and report
+            stage_changed = stage != last_stage
             last_stage = stage
             if percent is not None:
                 last_percent = percent
+
+            # Throttle: a 30k-step run matches a line per step; forward an update only
+            # on a stage change, at 0%/100%, or after PROGRESS_MIN_DELTA_PERCENT /
+            # PROGRESS_MIN_INTERVAL_SECONDS since the last one actually emitted
+            now = time.monotonic()
+            if not stage_changed and percent not in (0.0, 100.0):
+                if now - last_emit_time < PROGRESS_MIN_INTERVAL_SECONDS and (
+                    percent is None
+                    or last_emit_percent is None
+                    or abs(percent - last_emit_percent) < PROGRESS_MIN_DELTA_PERCENT
+                ):
+                    return
+            last_emit_time = now
+            last_emit_percent = percent
             report(percent, stage, msg)
 
         try:
@@ -113,7 +161,14 @@ class NerfstudioPipeline:
 
             artifact_filename = f"{job_id}.ply"
             artifact_path = output_path.parent / artifact_filename
-            shutil.copy2(ply_file, artifact_path)
+            # work_dir is deleted in finally: move the PLY out instead of copying
+            # (hundreds of MB–GB); only a cross-filesystem layout pays for a copy
+            try:
+                os.replace(ply_file, artifact_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.copy2(ply_file, artifact_path)
 
             report_monotonic(100.0, "export", "Complete")
             return str(artifact_path), self.ARTIFACT_FORMAT
@@ -138,83 +193,91 @@ class NerfstudioPipeline:
 
         process = await asyncio.create_subprocess_exec(
             *cmd,
-            stdout=asyncio.subprocess.PIPE,
+            # stdout is never parsed: discard it in the kernel instead of buffering it here
+            stdout=asyncio.subprocess.DEVNULL,
             stderr=asyncio.subprocess.PIPE,
+            limit=STDERR_STREAM_LIMIT,
         )
 
-        # SfM sub-stages: extract (0-15%), match (15-30%), reconstruct (30-40%)
-        sfm_sub_weights = {
-            "extract": (0.0, 15.0),
-            "match": (15.0, 30.0),
-            "reconstruct": (30.0, 40.0),
-        }
-
-        last_progress_time = asyncio.get_event_loop().time()
+        loop_time = asyncio.get_running_loop().time
+        last_progress_time = loop_time()
         current_stage = "extract"
         current_percent = 0.0
 
         async def _parse_sfm_output(stream: asyncio.StreamReader) -> None:
             """Parse SfM output stream for progress indicators."""
             nonlocal last_progress_time, current_stage, current_percent
-            buffer = b""
+            # Per-line hot loop: everything it touches is a fast local
+            # SfM sub-stages as (start, span): extract 0-15%, match 15-30%, reconstruct 30-40%
+            extract_start, extract_span = 0.0, 15.0
+            match_start, match_span = 15.0, 15.0
+            reconstruct_start, reconstruct_span = 30.0, 10.0
+            sfm_search = RE_SFM_COMBINED.search
+            feature_marker, regist_marker = _SFM_MARKERS
+            now = loop_time
+            # tqdm redraws with bare \r, so lines end at \r or \n (readline() would
+            # hold every tick until the next \n). Only the unterminated tail stays
+            # in the bytearray buffer; a 1s read timeout drives the stall check.
+            buffer = bytearray()
             while True:
                 try:
-                    chunk = await asyncio.wait_for(stream.read(4096), timeout=1.0)
-                    if not chunk:
+                    chunk = await asyncio.wait_for(stream.read(STDERR_READ_BYTES), timeout=1.0)
+                    if chunk:
+                        lines = _split_lines(buffer, chunk)
+                    elif buffer:
+                        # EOF: the last line may have no terminator
+                        lines = [bytes(buffer)]
+                        buffer.clear()
+                    else:
                         break
-                    buffer += chunk
-                    while b"\n" in buffer:
-                        line_bytes, buffer = buffer.split(b"\n", 1)
-                        line = line_bytes.decode("utf-8", errors="replace")
+                    for line_bytes in lines:
+                        lowered = line_bytes.lower()
+                        if feature_marker not in lowered and regist_marker not in lowered:
+                            continue
 
-                        # Try each pattern
-                        m = RE_SFM_EXTRACT.search(line)
-                        if m:
-                            current, total = int(m.group(1)), int(m.group(2))
+                        m = sfm_search(line_bytes)
+                        if m is None:
+                            continue
+                        kind = m.lastgroup
+
+                        if kind == "extract":
+                            current, total = int(m.group(2)), int(m.group(3))
                             if total > 0:
                                 sub_pct = current / total
-                                start, end = sfm_sub_weights["extract"]
-                                pct = start + sub_pct * (end - start)
+                                pct = extract_start + sub_pct * extract_span
                                 current_percent = pct
                                 current_stage = "extract"
-                                last_progress_time = asyncio.get_event_loop().time()
+                                last_progress_time = now()
                                 report(pct, "sfm", f"Extracting features: {current}/{total} images")
-                            continue
 
-                        m = RE_SFM_MATCH.search(line)
-                        if m:
-                            current, total = int(m.group(1)), int(m.group(2))
+                        elif kind == "match":
+                            current, total = int(m.group(5)), int(m.group(6))
                             if total > 0:
                                 sub_pct = current / total
-                                start, end = sfm_sub_weights["match"]
-                                pct = start + sub_pct * (end - start)
+                                pct = match_start + sub_pct * match_span
                                 current_percent = pct
                                 current_stage = "match"
-                                last_progress_time = asyncio.get_event_loop().time()
+                                last_progress_time = now()
                                 report(pct, "sfm", f"Matching features: {current}/{total} pairs")
-                            continue
 
-                        m = RE_SFM_RECONSTRUCT.search(line)
-                        if m:
-                            current = int(m.group(1))
-                            total = int(m.group(2)) if m.group(2) else (int(m.group(3)) if m.group(3) else None)
+                        else:
+                            current = int(m.group(8))
+                            total = int(m.group(9)) if m.group(9) else (int(m.group(10)) if m.group(10) else None)
                             if total and total > 0:
                                 sub_pct = current / total
-                                start, end = sfm_sub_weights["reconstruct"]
-                                pct = start + sub_pct * (end - start)
+                                pct = reconstruct_start + sub_pct * reconstruct_span
                                 current_percent = pct
                                 current_stage = "reconstruct"
-                                last_progress_time = asyncio.get_event_loop().time()
+                                last_progress_time = now()
                                 report(pct, "sfm", f"Reconstructing: {current}/{total} images registered")
                             else:
                                 # Progress without total: just update message
-                                last_progress_time = asyncio.get_event_loop().time()
+                                last_progress_time = now()
                                 report(current_percent, "sfm", f"Registering image {current}")
-                            continue
 
                 except asyncio.TimeoutError:
                     # Check for stage timeout
-                    elapsed = asyncio.get_event_loop().time() - last_progress_time
+                    elapsed = now() - last_progress_time
                     if elapsed > SFM_TIMEOUT_SECONDS:
                         raise TimeoutError(
                             f"SfM phase timed out after {SFM_TIMEOUT_SECONDS}s "
@@ -225,59 +288,20 @@ class NerfstudioPipeline:
                     # Ignore parsing errors, continue reading
                     continue
 
+        # Structured wait: the parser ends at stderr EOF, _reap_process waits for exit
+        # (then bounds the parser's drain); a stall TimeoutError from the parser
+        # cancels the sibling and lands in except* below
         try:
-            # Read both stdout and stderr concurrently
-            parse_task = asyncio.create_task(_parse_sfm_output(process.stderr))
-            # Also drain stdout to prevent pipe blocking
-            stdout_task = asyncio.create_task(process.stdout.read())
-
-            # Wait for process completion or timeout
-            done, pending = await asyncio.wait(
-                [parse_task, stdout_task, asyncio.create_task(process.wait())],
-                timeout=SFM_TIMEOUT_SECONDS + 10,  # Extra buffer for cleanup
-                return_when=asyncio.FIRST_COMPLETED,
-            )
-
-            # Check if process completed
-            if process.returncode is None:
-                # Process still running: check for timeout
-                elapsed = asyncio.get_event_loop().time() - last_progress_time
-                if elapsed > SFM_TIMEOUT_SECONDS:
-                    process.kill()
-                    await process.wait()
-                    raise TimeoutError(
-                        f"SfM phase timed out after {SFM_TIMEOUT_SECONDS}s "
-                        f"(last progress: {current_percent:.1f}% in {current_stage})"
-                    )
-
-            # Wait for process to finish
-            await process.wait()
-
-            # Cancel pending tasks
-            for task in pending:
-                task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
-
-            # Wait for parsing to finish (with timeout)
-            try:
-                await asyncio.wait_for(parse_task, timeout=5.0)
-            except asyncio.TimeoutError:
-                parse_task.cancel()
-                try:
-                    await parse_task
-                except asyncio.CancelledError:
-                    pass
-
-        except asyncio.TimeoutError:
+            async with asyncio.TaskGroup() as tg:
+                parse_task = tg.create_task(_parse_sfm_output(process.stderr))
+                tg.create_task(_reap_process(process, parse_task))
+        except* TimeoutError:
             process.kill()
             await process.wait()
             raise TimeoutError(
                 f"SfM phase timed out after {SFM_TIMEOUT_SECONDS}s "
                 f"(last progress: {current_percent:.1f}% in {current_stage})"
-            )
+            ) from None
 
         if process.returncode != 0:
             stderr_data = b""
@@ -312,40 +336,64 @@ class NerfstudioPipeline:
 
         process = await asyncio.create_subprocess_exec(
             *cmd,
-            stdout=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
             stderr=asyncio.subprocess.PIPE,
+            limit=STDERR_STREAM_LIMIT,
         )
 
-        last_progress_time = asyncio.get_event_loop().time()
+        loop_time = asyncio.get_running_loop().time
+        last_progress_time = loop_time()
         current_percent = SFM_WEIGHT
 
         async def _parse_training_output(stream: asyncio.StreamReader) -> None:
             """Parse training output for step progress."""
             nonlocal last_progress_time, current_percent
-            buffer = b""
+            # Per-line hot loop: everything it touches is a fast local
+            train_search = RE_TRAIN_STEP.search
+            step_marker = _TRAIN_STEP_MARKER
+            now = loop_time
+            step_lines = 0
+            # tqdm redraws with bare \r, so lines end at \r or \n (readline() would
+            # hold every tick until the next \n). Only the unterminated tail stays
+            # in the bytearray buffer; a 1s read timeout drives the stall check.
+            buffer = bytearray()
             while True:
                 try:
-                    chunk = await asyncio.wait_for(stream.read(4096), timeout=1.0)
-                    if not chunk:
+                    chunk = await asyncio.wait_for(stream.read(STDERR_READ_BYTES), timeout=1.0)
+                    if chunk:
+                        lines = _split_lines(buffer, chunk)
+                    elif buffer:
+                        # EOF: the last line may have no terminator
+                        lines = [bytes(buffer)]
+                        buffer.clear()
+                    else:
                         break
-                    buffer += chunk
-                    while b"\n" in buffer:
-                        line_bytes, buffer = buffer.split(b"\n", 1)
-                        line = line_bytes.decode("utf-8", errors="replace")
-
-                        m = RE_TRAIN_STEP.search(line)
+                    for line_bytes in lines:
+                        if step_marker not in line_bytes.lower():
+                            continue
+                        # Sample the per-iteration firehose: regex only every 32nd step line,
+                        # unless PROGRESS_MIN_INTERVAL_SECONDS passed without progress (slow
+                        # steps) or this is the unterminated last line at EOF
+                        step_lines += 1
+                        if (
+                            step_lines & TRAIN_STEP_SAMPLE_MASK
+                            and chunk
+                            and now() - last_progress_time < PROGRESS_MIN_INTERVAL_SECONDS
+                        ):
+                            continue
+                        m = train_search(line_bytes)
                         if m:
                             current, total = int(m.group(1)), int(m.group(2))
                             if total > 0:
                                 train_pct = current / total
                                 pct = SFM_WEIGHT + train_pct * TRAINING_WEIGHT
                                 current_percent = pct
-                                last_progress_time = asyncio.get_event_loop().time()
+                                last_progress_time = now()
                                 report(pct, "train", f"Training: step {current}/{total}")
 
                 except asyncio.TimeoutError:
                     # Check for stage timeout
-                    elapsed = asyncio.get_event_loop().time() - last_progress_time
+                    elapsed = now() - last_progress_time
                     if elapsed > TRAINING_TIMEOUT_SECONDS:
                         raise TimeoutError(
                             f"Training phase timed out after {TRAINING_TIMEOUT_SECONDS}s "
@@ -356,51 +404,20 @@ class NerfstudioPipeline:
                     # Ignore parsing errors, continue reading
                     continue
 
+        # Structured wait: the parser ends at stderr EOF, _reap_process waits for exit
+        # (then bounds the parser's drain); a stall TimeoutError from the parser
+        # cancels the sibling and lands in except* below
         try:
-            parse_task = asyncio.create_task(_parse_training_output(process.stderr))
-            stdout_task = asyncio.create_task(process.stdout.read())
-
-            done, pending = await asyncio.wait(
-                [parse_task, stdout_task, asyncio.create_task(process.wait())],
-                timeout=TRAINING_TIMEOUT_SECONDS + 10,
-                return_when=asyncio.FIRST_COMPLETED,
-            )
-
-            if process.returncode is None:
-                elapsed = asyncio.get_event_loop().time() - last_progress_time
-                if elapsed > TRAINING_TIMEOUT_SECONDS:
-                    process.kill()
-                    await process.wait()
-                    raise TimeoutError(
-                        f"Training phase timed out after {TRAINING_TIMEOUT_SECONDS}s "
-                        f"(last progress: {current_percent:.1f}%)"
-                    )
-
-            await process.wait()
-
-            for task in pending:
-                task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
-
-            try:
-                await asyncio.wait_for(parse_task, timeout=5.0)
-            except asyncio.TimeoutError:
-                parse_task.cancel()
-                try:
-                    await parse_task
-                except asyncio.CancelledError:
-                    pass
-
-        except asyncio.TimeoutError:
+            async with asyncio.TaskGroup() as tg:
+                parse_task = tg.create_task(_parse_training_output(process.stderr))
+                tg.create_task(_reap_process(process, parse_task))
+        except* TimeoutError:
             process.kill()
             await process.wait()
             raise TimeoutError(
                 f"Training phase timed out after {TRAINING_TIMEOUT_SECONDS}s "
                 f"(last progress: {current_percent:.1f}%)"
-            )
+            ) from None
 
         if process.returncode != 0:
             stderr_data = b""
@@ -415,9 +432,51 @@ class NerfstudioPipeline:
             )
 
     def _find_output_ply(self, work_dir: Path) -> Optional[Path]:
-        """Find output PLY file in work directory."""
-        for pattern in ["*.ply", "**/*.ply"]:
-            for ply_file in work_dir.glob(pattern):
-                if ply_file.is_file():
-                    return ply_file
-        return None
+        """Find output PLY file in work directory (top level, then outputs/, then the rest)."""
+        top = str(work_dir)
+        outputs = os.path.join(top, "outputs")
+        found = (
+            _first_ply(top, recursive=False)
+            or _first_ply(outputs, recursive=True)
+            # SfM detritus (frames, features) is only walked if outputs/ had nothing
+            or _first_ply(top, recursive=True, skip=outputs)
+        )
+        return Path(found) if found else None
+
+
+def _split_lines(buffer: bytearray, chunk: bytes) -> List[bytes]:
+    """Append chunk to buffer; remove and return every complete \r- or \n-terminated line."""
+    buffer += chunk
+    last_end = max(buffer.rfind(b"\n"), buffer.rfind(b"\r"))
+    if last_end < 0:
+        return []
+    lines = RE_LINE_END.split(buffer[:last_end])
+    del buffer[:last_end + 1]
+    return lines
+
+
+async def _reap_process(process: asyncio.subprocess.Process, parse_task: asyncio.Task) -> None:
+    """Wait for process exit, then give the stderr parser PARSER_DRAIN_TIMEOUT_SECONDS to hit EOF."""
+    await process.wait()
+    try:
+        await asyncio.wait_for(asyncio.shield(parse_task), timeout=PARSER_DRAIN_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        # A grandchild (colmap/ffmpeg) still holds stderr open: stop parsing
+        parse_task.cancel()
+
+
+def _first_ply(top: str, recursive: bool, skip: Optional[str] = None) -> Optional[str]:
+    """Return the first *.ply file under top; one os.scandir per directory, stops at the first hit."""
+    stack = [top]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.name.endswith(".ply") and entry.is_file():
+                        return entry.path
+                    if recursive and entry.path != skip and entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except OSError:
+            # Missing or unreadable directory (e.g. no outputs/ yet): nothing to find there
+            continue
+    return None
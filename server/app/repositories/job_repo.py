@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from sqlalchemy.orm import Session
 
@@ -16,6 +16,23 @@ class JobRepository:
         self.db.refresh(job)
         return job
 
+    def create_no_refresh(self, job: Job) -> Job:
+        """Create a new job without the post-commit refresh SELECT.
+
+        For callers that do not read server defaults (e.g. created_at) afterwards.
+        """
+        self.db.add(job)
+        self.db.commit()
+        return job
+
+    def create_many(self, jobs: List[Job]) -> List[Job]:
+        """Create several jobs in one transaction: one commit (one fsync) per batch."""
+        # add_all + flush batches the INSERTs (insertmanyvalues); bulk_save_objects
+        # is a legacy API in SQLAlchemy 2.x and skips relationship cascades
+        self.db.add_all(jobs)
+        self.db.commit()
+        return jobs
+
     def get_by_id(self, job_id: str) -> Optional[Job]:
         """Get job by ID."""
         return (
@@ -3,9 +3,9 @@
 # Contract Version: PR10-CLEANUP-1.0
 # Module: Three-Tier Self-Healing Cleanup Engine
 # Scope: cleanup_handler.py ONLY — does NOT govern other PR#10 files
-# Cross-Platform: Python 3.10+ (Linux + macOS)
+# Cross-Platform: Python 3.11+ (Linux + macOS)
 # Standards: POSIX file safety, fail-closed deletion
-# Dependencies: os (stdlib), shutil (stdlib), pathlib (stdlib), time (stdlib)
+# Dependencies: os (stdlib), shutil (stdlib), subprocess (stdlib), sys (stdlib), pathlib (stdlib), time (stdlib)
 # Activates: Dormant Capabilities #2 (cleanup_storage) and #4 (cleanup_old_files)
 # =============================================================================
 
@@ -22,21 +22,25 @@ All cleanup operations are fail-open (log errors but continue) to prevent
 partial cleanup failures from blocking operations.
 
 Cross-Platform Guarantees:
-- Python 3.10+ required
+- Python 3.11+ required
 - shutil.rmtree(): Works on both platforms. On macOS, may fail on locked files
   (not applicable for our use case — upload files are not locked).
 - os.path.getmtime(): Available on both platforms. Used for age-based cleanup.
+- rm -rf (_fast_rmtree): POSIX rm on both platforms, used for large trees only;
+  shutil.rmtree is the fallback when rm is unavailable or disabled in settings.
 - time.time(): Available on both platforms. Used for timestamp comparisons.
 """
 
 import logging
 import os
 import shutil
+import subprocess
+import sys
 import time
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List
+from typing import Callable, List
 
 from sqlalchemy.orm import Session
 
@@ -68,6 +72,64 @@ ASSEMBLING_MAX_AGE_HOURS = UploadContractConstants.ASSEMBLING_MAX_AGE_HOURS  # 2
 # Track last global cleanup time
 _last_global_cleanup_time: float = 0.0
 
+# Trees with at least this many entries are removed with native `rm -rf` (see _fast_rmtree)
+FAST_RMTREE_MIN_ENTRIES = 64
+
+
+def _has_at_least_entries(path: str, minimum: int) -> bool:
+    """True once `minimum` entries are seen under path (scandir walk, stops early)."""
+    seen = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    seen += 1
+                    if seen >= minimum:
+                        return True
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except OSError:
+            continue
+    return False
+
+
+def _fast_rmtree(path: Path) -> None:
+    """
+    Remove a directory tree; large trees go through native `rm -rf`.
+
+    Python's rmtree pays interpreter overhead per entry, which dominates on
+    upload dirs holding thousands of chunk files. Small trees (and hosts without
+    `rm`, or settings.cleanup_native_rm=False) use shutil.rmtree.
+
+    Raises:
+        OSError: If removal fails (same contract as shutil.rmtree, so callers'
+            INV-U25 fail-open handlers apply unchanged)
+    """
+    path_str = str(path)
+    rm = shutil.which("rm") if settings.cleanup_native_rm else None
+    if rm is None or not _has_at_least_entries(path_str, FAST_RMTREE_MIN_ENTRIES):
+        shutil.rmtree(path_str, ignore_errors=False)
+        return
+    try:
+        subprocess.run([rm, "-rf", "--", path_str], check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode("utf-8", errors="replace").strip()
+        raise OSError(f"rm -rf exited with {e.returncode}: {stderr}") from e
+
+
+def _rmtree_reporting(path_str: str, on_exc: Callable[[Callable, str, BaseException], None]) -> None:
+    """
+    shutil.rmtree that reports each failure to on_exc(func, path, exc) and keeps going.
+
+    Python 3.12+ deprecates onerror (exc_info tuple) in favour of onexc
+    (exception instance); 3.11 only has onerror.
+    """
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(path_str, onexc=on_exc)
+    else:
+        shutil.rmtree(path_str, onerror=lambda func, path, exc_info: on_exc(func, path, exc_info[1]))
+
 
 @dataclass
 class CleanupResult:
@@ -136,25 +198,34 @@ class CleanupHandler:
         start_time = time.monotonic()
         result = CleanupResult()
         
-        # Delete chunk files
+        # Delete chunk files: one scandir (single getdents pass, no stat) for the count,
+        # then one rmtree — no Path object or Python-level unlink call per chunk
         chunk_dir = settings.upload_path / upload_id / "chunks"
         if chunk_dir.exists():
-            for chunk_file in chunk_dir.iterdir():
-                try:
-                    chunk_file.unlink()
-                    result.chunks_deleted += 1
-                except OSError as e:
-                    # INV-U25: Log and continue
-                    logger.warning("Failed to delete chunk %s: %s", chunk_file, e)
-                    result.errors.append(f"chunk: {chunk_file}: {e}")
-            
+            chunk_dir_str = str(chunk_dir)
             try:
-                chunk_dir.rmdir()
+                with os.scandir(chunk_dir_str) as entries:
+                    chunk_count = sum(1 for _ in entries)
+            except OSError:
+                chunk_count = 0
+            chunk_failures = 0
+            
+            def _on_rmtree_error(func, path, e) -> None:
+                # INV-U25: rmtree reports each failure here and keeps going
+                nonlocal chunk_failures
+                if path == chunk_dir_str:
+                    # Directory not empty (some chunks failed to delete) — OK
+                    logger.warning("Failed to remove chunk dir %s: %s", chunk_dir, e)
+                    result.errors.append(f"dir: {chunk_dir}: {e}")
+                else:
+                    chunk_failures += 1
+                    logger.warning("Failed to delete chunk %s: %s", path, e)
+                    result.errors.append(f"chunk: {path}: {e}")
+            
+            _rmtree_reporting(chunk_dir_str, _on_rmtree_error)
+            result.chunks_deleted += max(0, chunk_count - chunk_failures)
+            if not chunk_dir.exists():
                 result.dirs_deleted += 1
-            except OSError as e:
-                # Directory not empty (some chunks failed to delete) — OK
-                logger.warning("Failed to remove chunk dir %s: %s", chunk_dir, e)
-                result.errors.append(f"dir: {chunk_dir}: {e}")
         
         # Delete assembly temp files
         assembly_dir = settings.upload_path / upload_id / "assembly"
@@ -224,7 +295,7 @@ class CleanupHandler:
                 session_dir = settings.upload_path / session.id
                 if session_dir.exists():
                     try:
-                        shutil.rmtree(str(session_dir), ignore_errors=False)
+                        _fast_rmtree(session_dir)
                         result.dirs_deleted += 1
                     except OSError as e:
                         logger.warning("Failed to delete expired session dir %s: %s", session_dir, e)
@@ -293,7 +364,7 @@ class CleanupHandler:
                 session_dir = settings.upload_path / session.id
                 if session_dir.exists():
                     try:
-                        shutil.rmtree(str(session_dir), ignore_errors=False)
+                        _fast_rmtree(session_dir)
                         result.dirs_deleted += 1
                     except OSError as e:
                         logger.warning("Failed to delete expired session dir %s: %s", session_dir, e)
@@ -323,7 +394,7 @@ class CleanupHandler:
                     if mtime < cutoff_time:
                         # INV-U26: Orphan safety margin — only delete after 2× expiry
                         try:
-                            shutil.rmtree(str(item), ignore_errors=False)
+                            _fast_rmtree(item)
                             result.orphans_cleaned += 1
                             result.dirs_deleted += 1
                         except OSError as e:
@@ -3,7 +3,7 @@
 # Contract Version: PR10-DEDUP-1.0
 # Module: Three-Path Fusion Dedup Engine
 # Scope: deduplicator.py ONLY — does NOT govern other PR#10 files
-# Cross-Platform: Python 3.10+ (Linux + macOS)
+# Cross-Platform: Python 3.11+ (Linux + macOS)
 # Dependencies: sqlalchemy (existing), hmac (stdlib)
 # Activates: Dormant Capabilities #3 (Job.bundle_hash index) and #5 (UploadSession.bundle_hash index)
 # =============================================================================
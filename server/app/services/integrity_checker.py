@@ -3,7 +3,7 @@
 # Contract Version: PR10-INTEGRITY-1.0
 # Module: Five-Layer Progressive Verification Engine
 # Scope: integrity_checker.py ONLY — does NOT govern other PR#10 files
-# Cross-Platform: Python 3.10+ (Linux + macOS)
+# Cross-Platform: Python 3.11+ (Linux + macOS)
 # Standards: RFC 9162 (Merkle), RFC 8785 (JCS), OWASP Cryptographic Verification
 # Dependencies: hashlib (stdlib), hmac (stdlib), math (stdlib), random (stdlib)
 # Swift Counterparts: VerificationMode.swift, MerkleTree.swift, MerkleTreeHash.swift,
@@ -26,7 +26,7 @@ Layer Architecture:
 - L4: Domain-separated bundleHash recomputation — O(1) (reserved for future)
 
 Cross-Platform Guarantees:
-- Python 3.10+ required
+- Python 3.11+ required
 - hashlib.sha256: Uses OpenSSL on Linux, CommonCrypto on macOS — both produce
   identical output for identical input (SHA-256 is deterministic by spec)
 - Merkle tree implementation matches Swift MerkleTree.swift byte-for-byte
@@ -17,11 +17,14 @@ class JobService:
     
     async def process_job(self, job_id: str, pipeline_type: str = "dummy") -> None:
         """Process job asynchronously with real-time progress updates."""
-        job = self.job_repo.get_by_id(job_id)
+        # Repository calls commit synchronously (fsync / DB round-trip): run them in
+        # a worker thread so other jobs' coroutines keep running. Each call is awaited
+        # before the next, so the Session is never used from two threads at once.
+        job = await asyncio.to_thread(self.job_repo.get_by_id, job_id)
         if not job:
             raise NotFoundError("Job", job_id)
         
-        asset = self.asset_repo.get_by_id(job.asset_id)
+        asset = await asyncio.to_thread(self.asset_repo.get_by_id, job.asset_id)
         if not asset:
             raise NotFoundError("Asset", job.asset_id)
         
@@ -33,7 +36,7 @@ class JobService:
         job.progress_stage = None
         job.progress_message = None
         job.processing_started_at = datetime.now(timezone.utc)
-        self.job_repo.update(job)
+        await asyncio.to_thread(self.job_repo.update, job)
         
         # Throttle DB writes: minPercentDelta = 1.0%, minIntervalSeconds = 2.0s
         MIN_PERCENT_DELTA = 1.0
@@ -111,7 +114,7 @@ class JobService:
             )
             
             # Update job with artifact
-            job = self.job_repo.get_by_id(job_id)
+            job = await asyncio.to_thread(self.job_repo.get_by_id, job_id)
             if job:
                 job.artifact_path = artifact_path
                 job.artifact_format = artifact_format
@@ -121,7 +124,7 @@ class JobService:
                 job.progress_percent = "100.0"
                 job.progress_stage = "export"
                 job.progress_message = "Complete"
-                self.job_repo.update(job)
+                await asyncio.to_thread(self.job_repo.update, job)
         
         except Exception as e:
             error_msg = str(e)
@@ -129,7 +132,7 @@ class JobService:
                 error_msg = e.message
             
             # Always write failure state (no throttle)
-            job = self.job_repo.get_by_id(job_id)
+            job = await asyncio.to_thread(self.job_repo.get_by_id, job_id)
             if job:
                 job.status = "failed"
                 job.state = "failed"
@@ -138,6 +141,6 @@ class JobService:
                 # Preserve last known progress
                 if job.progress_stage:
                     job.progress_message = f"Failed: {error_msg}"
-                self.job_repo.update(job)
+                await asyncio.to_thread(self.job_repo.update, job)
             raise
 
@@ -3,7 +3,7 @@
 # Contract Version: PR10-UPLOAD-1.0
 # Module: Server Upload Reception — Contract Constants (SSOT)
 # Scope: upload_contract_constants.py ONLY — does NOT govern other PR#10 files
-# Cross-Platform: Python 3.10+ (Linux + macOS)
+# Cross-Platform: Python 3.11+ (Linux + macOS)
 # Standards: SSOT pattern from contract_constants.py (PR#3)
 # Dependencies: None (stdlib only)
 # Swift Counterpart: Core/Constants/BundleConstants.swift (PR#8)
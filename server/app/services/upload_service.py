@@ -3,9 +3,10 @@
 # Contract Version: PR10-UPLOAD-1.0
 # Module: Server Upload Reception — Three-Way Pipeline Assembly Engine
 # Scope: upload_service.py ONLY — does NOT govern other PR#10 files
-# Cross-Platform: Python 3.10+ (Linux + macOS)
+# Cross-Platform: Python 3.11+ (Linux + macOS)
 # Standards: RFC 9162 (Merkle), POSIX fsync, OWASP File Upload Security
-# Dependencies: hashlib (stdlib), hmac (stdlib), os (stdlib), pathlib (stdlib)
+# Dependencies: hashlib (stdlib), hmac (stdlib), os (stdlib), pathlib (stdlib),
+#               asyncio (stdlib), concurrent.futures (stdlib), ssl (stdlib), uuid (stdlib)
 # Swift Counterpart: Core/Upload/ImmutableBundle.swift (PR#8)
 # =============================================================================
 
@@ -17,29 +18,39 @@ pipeline that reads chunks, writes the bundle file, and computes hashes in
 a single pass, achieving 3× performance improvement over traditional methods.
 
 Cross-Platform Guarantees:
-- Python 3.10+ required (match type syntax, structural pattern matching)
+- Python 3.11+ required (server-wide floor, enforced in app/__init__.py)
 - hashlib.sha256: Uses OpenSSL on Linux, CommonCrypto on macOS — both produce
   identical output for identical input (SHA-256 is deterministic by spec)
 - os.rename(): Atomic on same filesystem on both ext4 (Linux) and APFS (macOS)
   WARNING: NOT atomic across filesystems. upload_dir MUST be on same filesystem.
-- _durable_fsync(): Uses F_FULLFSYNC on macOS (Python 3.10-3.11) for true
+- _durable_fsync(): Uses F_FULLFSYNC on macOS (Python 3.11) for true
   durability. Python 3.12+ already does this in os.fsync().
 - pathlib.Path.resolve(): Follows symlinks on both platforms. Used for path
   containment validation (INV-U9).
 - shutil.rmtree(): Works on both platforms. On macOS, may fail on locked files
   (not applicable for our use case — upload files are not locked).
+- os.copy_file_range(): Linux 4.5+ only. Assembly falls back to pread/write on
+  macOS or when the filesystem refuses the in-kernel copy.
+- os.posix_fallocate() / os.posix_fadvise(): Linux only. Chunk preallocation and
+  page-cache release are skipped on macOS (attributes absent) — advisory only.
 - time.monotonic(): Available on both platforms. Used for elapsed time measurement.
   NOT suitable for timestamps (no absolute time). Use datetime.utcnow() for timestamps.
 """
 
+import asyncio
+import errno
 import hashlib
 import hmac
 import logging
+import mmap
 import os
 import re
 import shutil
+import ssl
 import sys
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
@@ -62,6 +73,29 @@ CHUNK_INDEX_PADDING: int = UploadContractConstants.CHUNK_INDEX_PADDING
 _SAFE_ID_PATTERN = re.compile(r"^[a-zA-Z0-9_-]+$")
 _SHA256_HEX_PATTERN = re.compile(r"^[0-9a-f]{64}$")
 
+# copy_file_range() errors that mean "not supported here" rather than I/O failure
+_COPY_FALLBACK_ERRNOS = frozenset(
+    code for code in (
+        errno.EXDEV, errno.EINVAL, errno.ENOSYS,
+        getattr(errno, "EOPNOTSUPP", None), getattr(errno, "ENOTSUP", None),
+    ) if code is not None
+)
+
+# Pre-initialized SHA-256 context. new_sha256() clones it with .copy(), which
+# duplicates the initialized EVP_MD_CTX in C instead of allocating and running
+# EVP_DigestInit_ex for every chunk. Never update() the template itself.
+_SHA256_TEMPLATE = hashlib.sha256()
+
+# Dedicated executor for chunk persistence.
+# WHY not the default executor: ChunkWriter blocks on write + fsync. On the
+# event loop it stalls every request; on anyio's shared threadpool it competes
+# with all other sync work. A separate pool sized to disk concurrency keeps
+# disk-bound writes from starving header parsing and early 4xx rejections.
+_CHUNK_IO_POOL = ThreadPoolExecutor(
+    max_workers=settings.chunk_io_workers,
+    thread_name_prefix="chunkio",
+)
+
 
 class AssemblyState(str, Enum):
     """
@@ -171,6 +205,39 @@ class AssemblyResult:
     chunk_hashes: list[bytes]  # List of chunk SHA-256 bytes (for Merkle tree)
 
 
+def new_sha256():
+    """Return a fresh SHA-256 hasher cloned from the module template."""
+    return _SHA256_TEMPLATE.copy()
+
+
+def sha256_backend_info() -> dict:
+    """
+    Describe which SHA-256 implementation chunk hashing runs on.
+
+    hashlib.sha256 is OpenSSL's EVP SHA-256 when CPython is built against
+    OpenSSL (module "_hashlib"); OpenSSL selects SHA-NI / ARMv8 SHA2 rounds at
+    runtime when the CPU advertises them. The "_sha2"/"_sha256" builtin is the
+    scalar fallback and is several times slower on 5MB chunks.
+
+    cpu_sha_extensions is None when /proc/cpuinfo is unavailable (macOS).
+    """
+    cpu_sha_extensions = None
+    try:
+        with open("/proc/cpuinfo", "r", encoding="ascii", errors="replace") as f:
+            flags = set()
+            for line in f:
+                if line.startswith(("flags", "Features")):
+                    flags.update(line.split(":", 1)[-1].split())
+        cpu_sha_extensions = bool(flags & {"sha_ni", "sha2"})
+    except OSError:
+        pass
+    return {
+        "backend": type(_SHA256_TEMPLATE).__module__,
+        "openssl_version": ssl.OPENSSL_VERSION,
+        "cpu_sha_extensions": cpu_sha_extensions,
+    }
+
+
 def _durable_fsync(fd: int) -> None:
     """
     Platform-aware fsync with macOS F_FULLFSYNC support.
@@ -182,7 +249,7 @@ def _durable_fsync(fd: int) -> None:
     Cross-Platform Guarantee:
     - Linux: calls fsync(2) → data durable on device
     - macOS Python ≥ 3.12: os.fsync() already calls F_FULLFSYNC
-    - macOS Python 3.10-3.11: we call fcntl(F_FULLFSYNC) explicitly
+    - macOS Python 3.11: we call fcntl(F_FULLFSYNC) explicitly
 
     WHY not just always use F_FULLFSYNC: F_FULLFSYNC is macOS-only.
     On Linux, it would raise an error.
@@ -197,6 +264,80 @@ def _durable_fsync(fd: int) -> None:
     os.fsync(fd)
 
 
+def _preallocate(fd: int, size: int) -> None:
+    """
+    Reserve disk extents for a file of known final size (Linux only).
+
+    Advisory: filesystems without fallocate support (EOPNOTSUPP) and
+    platforms without os.posix_fallocate (macOS) simply skip it.
+    """
+    if size <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except OSError:
+        pass
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """
+    Write the whole buffer, looping on short writes.
+
+    os.write() may return fewer bytes than requested (signals, pipe/NFS
+    limits). memoryview slicing keeps the retry path zero-copy.
+    """
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _copy_file_contents(src_fd: int, dst_fd: int, size: int) -> int:
+    """
+    Append the first `size` bytes of src_fd to dst_fd's current offset.
+
+    Uses os.copy_file_range() (Linux 4.5+) so bytes never enter userspace;
+    on filesystems that reflink (XFS, Btrfs) no data is copied at all.
+    Falls back to pread/write in ASSEMBLY_BUFFER_BYTES batches where the
+    syscall is missing (macOS) or refused (EXDEV/EINVAL/ENOSYS/EOPNOTSUPP).
+
+    src_fd must be positioned at offset 0. Returns bytes copied.
+    """
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied < size:
+                n = os.copy_file_range(src_fd, dst_fd, size - copied)
+                if n == 0:
+                    return copied  # Source shrank underneath us
+                copied += n
+            return copied
+        except OSError as e:
+            if e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+    while copied < size:
+        buf = os.pread(src_fd, min(ASSEMBLY_BUFFER_BYTES, size - copied), copied)
+        if not buf:
+            break
+        _write_all(dst_fd, buf)
+        copied += len(buf)
+    return copied
+
+
+def _drop_page_cache(fd: int) -> None:
+    """
+    Advise the kernel to drop cached pages for an fsync'd file (Linux only).
+
+    Must be called AFTER fsync — DONTNEED does not evict dirty pages.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+
+
 def validate_path_component(value: str, field_name: str) -> str:
     """
     Validate that a string is safe for use as a path component.
@@ -284,6 +425,149 @@ def check_disk_quota() -> tuple[bool, float]:
         return False, 1.0
 
 
+class ChunkWriter:
+    """
+    Incremental chunk persistence: open → write()* → sync() → publish() | abort().
+
+    commit() is sync() + publish(); upload_chunk() calls them separately so the
+    DB upsert decides, between the two, whether this request's bytes are published.
+
+    Same INV-U1/U7/U9 sequence as persist_chunk(), split so a streamed request
+    body reaches disk batch by batch instead of after full buffering.
+
+    INV-U1: Bytes land in a .tmp file; only publish() renames it into place.
+    INV-U7: sync() fsyncs the file before the rename, publish() the directory after.
+    INV-U9: Path validation and containment run before anything is opened.
+
+    write() feeds the optional hasher and the file from the same slice back to
+    back, so each byte is read from memory once while still cache-hot.
+    The .tmp name carries a random suffix: concurrent uploads of one index
+    stream side by side and only the DB upsert winner publishes.
+
+    Not thread-safe — callers serialize write()/commit()/abort().
+    """
+
+    def __init__(self, upload_id: str, chunk_index: int, size: int, hasher=None):
+        # INV-U9: Validate path component BEFORE any file operations
+        validate_path_component(upload_id, "upload_id")
+        
+        chunk_dir = settings.upload_path / upload_id / "chunks"
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+        
+        # INV-U9: Verify resolved path is within upload directory
+        _assert_within_upload_dir(chunk_dir)
+        
+        # Check disk quota before writing
+        allowed, usage = check_disk_quota()
+        if not allowed:
+            raise AssemblyError(
+                f"Disk quota exceeded ({usage:.1%} used)",
+                kind=UploadErrorKind.DISK_QUOTA_EXCEEDED
+            )
+        
+        self.chunk_dir = chunk_dir
+        self.size = size
+        self.hasher = hasher
+        self.written = 0
+        self.tmp_path = chunk_dir / f"{chunk_index:0{CHUNK_INDEX_PADDING}d}.chunk.{uuid.uuid4().hex}.tmp"
+        self.final_path = chunk_dir / f"{chunk_index:0{CHUNK_INDEX_PADDING}d}.chunk"
+        
+        # INV-U1: Write to .tmp file first
+        self._fd = os.open(str(self.tmp_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        # Reserve all extents up front so the 5MB body lands in one allocation
+        _preallocate(self._fd, size)
+
+    @classmethod
+    async def open_async(cls, upload_id: str, chunk_index: int, size: int, hasher=None) -> "ChunkWriter":
+        """Open on the chunk I/O pool (mkdir, statvfs and open stay off the event loop)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _CHUNK_IO_POOL, cls, upload_id, chunk_index, size, hasher
+        )
+
+    def write(self, data) -> None:
+        """Hash (if a hasher was given) and append one batch."""
+        if self.hasher is not None:
+            self.hasher.update(data)
+        try:
+            _write_all(self._fd, data)
+        except OSError as e:
+            raise AssemblyError(
+                f"Chunk write failed: {e}",
+                kind=UploadErrorKind.CHUNK_WRITE_FAILED
+            ) from e
+        self.written += len(data)
+
+    async def write_async(self, data) -> None:
+        """write() on the chunk I/O pool."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_CHUNK_IO_POOL, self.write, data)
+
+    def sync(self) -> None:
+        """fsync, close and verify size; the .tmp stays unpublished until publish()."""
+        # Step 1-4: fsync + close
+        try:
+            # INV-U7: fsync before rename
+            _durable_fsync(self._fd)
+            # Chunk is read back once at assembly then deleted — don't keep it cached
+            _drop_page_cache(self._fd)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+        
+        # Verify written size (st_size alone is not enough: preallocation sets it)
+        written_size = self.tmp_path.stat().st_size
+        if self.written != self.size or written_size != self.size:
+            self.tmp_path.unlink(missing_ok=True)
+            raise AssemblyError(
+                f"Written size {self.written} != expected {self.size}",
+                kind=UploadErrorKind.CHUNK_WRITE_FAILED
+            )
+
+    async def sync_async(self) -> None:
+        """sync() on the chunk I/O pool."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_CHUNK_IO_POOL, self.sync)
+
+    def publish(self) -> Path:
+        """Atomically rename the synced .tmp into place. Returns the chunk path."""
+        # Step 5: Atomic rename
+        # INV-U1: atomic on same filesystem
+        try:
+            self.tmp_path.rename(self.final_path)
+            
+            # Step 6: fsync directory to make rename durable
+            dir_fd = os.open(str(self.chunk_dir), os.O_RDONLY)
+            try:
+                _durable_fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError as e:
+            raise AssemblyError(
+                f"Chunk publish failed: {e}",
+                kind=UploadErrorKind.CHUNK_WRITE_FAILED
+            ) from e
+        
+        return self.final_path
+
+    async def publish_async(self) -> Path:
+        """publish() on the chunk I/O pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_CHUNK_IO_POOL, self.publish)
+
+    def commit(self) -> Path:
+        """sync() then publish(). Returns the chunk path."""
+        self.sync()
+        return self.publish()
+
+    def abort(self) -> None:
+        """Discard the .tmp file. Idempotent; a no-op after a successful publish()."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self.tmp_path.unlink(missing_ok=True)
+
+
 def persist_chunk(upload_id: str, chunk_index: int, chunk_data: bytes, expected_hash: str) -> Path:
     """
     Persist chunk binary data to disk with atomic write pattern.
@@ -316,57 +600,13 @@ def persist_chunk(upload_id: str, chunk_index: int, chunk_data: bytes, expected_
     Raises:
         AssemblyError: If persistence fails
     """
-    # INV-U9: Validate path component BEFORE any file operations
-    validate_path_component(upload_id, "upload_id")
-    
-    chunk_dir = settings.upload_path / upload_id / "chunks"
-    chunk_dir.mkdir(parents=True, exist_ok=True)
-    
-    # INV-U9: Verify resolved path is within upload directory
-    _assert_within_upload_dir(chunk_dir)
-    
-    tmp_path = chunk_dir / f"{chunk_index:0{CHUNK_INDEX_PADDING}d}.chunk.tmp"
-    final_path = chunk_dir / f"{chunk_index:0{CHUNK_INDEX_PADDING}d}.chunk"
-    
-    # Check disk quota before writing
-    allowed, usage = check_disk_quota()
-    if not allowed:
-        raise AssemblyError(
-            f"Disk quota exceeded ({usage:.1%} used)",
-            kind=UploadErrorKind.DISK_QUOTA_EXCEEDED
-        )
-    
-    # Step 1-4: Write + fsync file
-    # INV-U1: Write to .tmp file first
-    fd = os.open(str(tmp_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    writer = ChunkWriter(upload_id, chunk_index, len(chunk_data))
     try:
-        os.write(fd, chunk_data)
-        # INV-U7: fsync before rename
-        _durable_fsync(fd)
-    finally:
-        os.close(fd)
-    
-    # Verify written size
-    written_size = tmp_path.stat().st_size
-    if written_size != len(chunk_data):
-        tmp_path.unlink(missing_ok=True)
-        raise AssemblyError(
-            f"Written size {written_size} != expected {len(chunk_data)}",
-            kind=UploadErrorKind.CHUNK_WRITE_FAILED
-        )
-    
-    # Step 5: Atomic rename
-    # INV-U1: atomic on same filesystem
-    tmp_path.rename(final_path)
-    
-    # Step 6: fsync directory to make rename durable
-    dir_fd = os.open(str(chunk_dir), os.O_RDONLY)
-    try:
-        _durable_fsync(dir_fd)
-    finally:
-        os.close(dir_fd)
-    
-    return final_path
+        writer.write(chunk_data)
+        return writer.commit()
+    except BaseException:
+        writer.abort()
+        raise
 
 
 def assemble_bundle(upload_id: str, session, db) -> AssemblyResult:
@@ -382,13 +622,13 @@ def assemble_bundle(upload_id: str, session, db) -> AssemblyResult:
     INV-U8: Assembly temp isolation — .assembling files NEVER in final bundle path.
     INV-U9: Path containment — all file operations confined to upload_dir/{upload_id}/ subtree.
 
-    The three-way pipeline performs read, write, and hash operations simultaneously:
-    - Read chunk file in 256KB buffers
-    - Write to bundle file
-    - Update SHA-256 hasher
+    The three-way pipeline touches each chunk's bytes once from userspace:
+    - mmap the chunk file and feed the mapping to the chunk + bundle hashers
+    - Copy the chunk into the bundle file in-kernel (_copy_file_contents)
     - Verify chunk hash matches DB record
 
-    This achieves 3× performance improvement over traditional 3-pass approach.
+    Chunk data never passes through Python buffers on Linux; macOS falls back
+    to a pread/write loop with ASSEMBLY_BUFFER_BYTES batches.
 
     Args:
         upload_id: Upload session ID
@@ -447,13 +687,13 @@ def assemble_bundle(upload_id: str, session, db) -> AssemblyResult:
     chunk_hashes = []
     
     # Initialize hashers
-    bundle_hasher = hashlib.sha256()
+    bundle_hasher = new_sha256()
     
-    # INV-U2: Three-way pipeline — read, write, hash in single pass
+    # INV-U2: Three-way pipeline — hash from mmap, copy in kernel, no userspace buffers
     try:
         bundle_fd = os.open(str(assembling_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
         try:
-            write_buf = bytearray()  # Write buffer for coalescing
+            _preallocate(bundle_fd, session.bundle_size)
             
             for chunk_record in chunks:
                 chunk_file = settings.upload_path / upload_id / "chunks" / f"{chunk_record.chunk_index:0{CHUNK_INDEX_PADDING}d}.chunk"
@@ -465,43 +705,43 @@ def assemble_bundle(upload_id: str, session, db) -> AssemblyResult:
                     )
                 
                 # INV-U6: Per-chunk hash verification
-                chunk_hasher = hashlib.sha256()
+                chunk_hasher = new_sha256()
                 
                 chunk_fd = os.open(str(chunk_file), os.O_RDONLY)
                 try:
-                    while True:
-                        buf = os.read(chunk_fd, HASH_STREAM_CHUNK_BYTES)
-                        if not buf:
-                            break
-                        
-                        # Three-way: read, write, hash
-                        bundle_hasher.update(buf)
-                        chunk_hasher.update(buf)
-                        
-                        # Write coalescing
-                        write_buf.extend(buf)
-                        if len(write_buf) >= ASSEMBLY_BUFFER_BYTES:
-                            os.write(bundle_fd, write_buf)
-                            write_buf.clear()
-                        
-                        total_bytes += len(buf)
+                    chunk_size = os.fstat(chunk_fd).st_size
+                    if chunk_size:
+                        # Hash straight from the mapped pages — no userspace buffer copies
+                        with mmap.mmap(chunk_fd, chunk_size, access=mmap.ACCESS_READ) as mapped:
+                            bundle_hasher.update(mapped)
+                            chunk_hasher.update(mapped)
+                    
+                    # Bytes move page cache → bundle file entirely inside the kernel
+                    copied = _copy_file_contents(chunk_fd, bundle_fd, chunk_size)
+                    if copied != chunk_size:
+                        raise AssemblyError(
+                            f"Chunk {chunk_record.chunk_index} short copy: {copied} != {chunk_size}",
+                            kind=UploadErrorKind.CHUNK_READ_FAILED
+                        )
+                    total_bytes += copied
                 finally:
                     os.close(chunk_fd)
                 
                 # INV-U6: Verify chunk hash matches DB record
-                chunk_hash_hex = chunk_hasher.hexdigest()
+                # Raw 32-byte digests: no hexdigest() allocation, half the compare input
+                chunk_digest = chunk_hasher.digest()
+                try:
+                    expected_digest = bytes.fromhex(chunk_record.chunk_hash)
+                except ValueError:
+                    expected_digest = b""  # Corrupt DB value → falls through to mismatch
                 # SEAL FIX: Use hmac.compare_digest() for timing-safe comparison
-                if not hmac.compare_digest(chunk_hash_hex, chunk_record.chunk_hash.lower()):
+                if not hmac.compare_digest(chunk_digest, expected_digest):
                     raise AssemblyError(
                         f"Chunk {chunk_record.chunk_index} hash mismatch",
                         kind=UploadErrorKind.CHUNK_HASH_MISMATCH
                     )
                 
-                chunk_hashes.append(chunk_hasher.digest())
-            
-            # Flush remaining write buffer
-            if write_buf:
-                os.write(bundle_fd, write_buf)
+                chunk_hashes.append(chunk_digest)
             
             # INV-U7: fsync before rename
             _durable_fsync(bundle_fd)
@@ -589,13 +829,10 @@ def verify_assembly(result: AssemblyResult, expected_bundle_hash: str) -> bool:
 #   - Phase 3: Serverless assembly (AWS Lambda + S3)
 #   - Phase 4: Dedicated upload service (gRPC, separate from API server)
 #
-# FUTURE-ZEROCOPY: For assembly without re-hashing (when all chunk hashes
-# were verified at upload time and are trusted), use os.copy_file_range()
-# for zero-copy kernel-to-kernel chunk concatenation:
-#   os.copy_file_range(src_fd, dst_fd, chunk_size, src_offset)
-# Available on Linux 4.5+ (Python 3.8+). Not available on macOS.
-# Expected performance improvement: 2-3× for large bundles (> 100MB)
-# by avoiding userspace buffer copies.
+# FUTURE-ZEROCOPY: Chunk concatenation already uses os.copy_file_range()
+# (see _copy_file_contents). The remaining userspace pass is the per-chunk
+# re-hash (INV-U6). When chunk hashes verified at upload time become trusted,
+# hashing can be dropped and assembly becomes a pure kernel-to-kernel copy.
 #
 # FUTURE-CAS-NAMING: For defense-in-depth against chunk substitution attacks,
 # consider naming chunk files by their SHA-256 hash instead of index:
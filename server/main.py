@@ -17,10 +17,9 @@ from app.api.contract import APIError, APIErrorCode, APIResponse
 from app.api.routes import router
 from app.core.config import settings
 from app.database import Base, engine
+from app.middleware.gateway import GatewayMiddleware
+from app.middleware.header_cache import HeaderCacheMiddleware
 from app.middleware.idempotency import IdempotencyMiddleware
-from app.middleware.identity import IdentityMiddleware
-from app.middleware.rate_limit import RateLimitMiddleware
-from app.middleware.request_id import RequestIdMiddleware
 from app.middleware.request_size import RequestSizeMiddleware
 
 
@@ -42,6 +41,14 @@ async def lifespan(app: FastAPI):
     finally:
         db.close()
     
+    # Chunk hashing throughput depends on OpenSSL EVP + CPU SHA extensions
+    from app.services.upload_service import sha256_backend_info
+    hash_info = sha256_backend_info()
+    if hash_info["backend"] != "_hashlib":
+        logger.warning("SHA-256 is not OpenSSL-backed, chunk hashing will be slow: %s", hash_info)
+    else:
+        logger.info("SHA-256 backend: %s", hash_info)
+    
     yield
     # Cleanup (if needed)
 
@@ -56,17 +63,17 @@ app = FastAPI(
     redirect_slashes=False  # GATE-3
 )
 
-# 中间件顺序（重要）：
-# 1. Request-Id（最外层，所有响应都需要）
-# 2. Request Size（PATCH-8：header和JSON body大小检查）
-# 3. Identity（X-Device-Id校验）
-# 4. Rate Limit（基于device_id）
-# 5. Idempotency（幂等性检查）
-app.add_middleware(RequestIdMiddleware)
-app.add_middleware(RequestSizeMiddleware)
-app.add_middleware(IdentityMiddleware)
-app.add_middleware(RateLimitMiddleware)
+# 中间件顺序（重要，add_middleware()后加的在外层；以下为内→外）：
+# 1. Idempotency（幂等性检查，需要request.state.user_id）
+# 2. Gateway（单次ASGI处理：Request-Id → Identity → Rate Limit）
+# 3. Request Size（PATCH-8：header和body大小检查）
+# 4. Header Cache（最外层：一次扫描headers，供以上中间件共享）
 app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(GatewayMiddleware)
+# WHY outside Gateway/Idempotency: oversized bodies are rejected before
+# Idempotency buffers them via request.body().
+app.add_middleware(RequestSizeMiddleware)
+app.add_middleware(HeaderCacheMiddleware)
 
 # CORS
 app.add_middleware(
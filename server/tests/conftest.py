@@ -0,0 +1,12 @@
+"""测试公共fixture"""
+
+import pytest
+
+from app.middleware.gateway import _rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limiter():
+    """所有测试共用同一个app和少数几个device_id：每个测试从满令牌桶开始，互不影响"""
+    _rate_limiter.clear()
+    yield
@@ -22,7 +22,7 @@ def test_handlers_no_direct_401_403():
     # 白名单：auth相关的文件可以返回401/403
     whitelist = {
         "auth.py",
-        "identity.py",  # IdentityMiddleware可能返回401相关的错误
+        "identity.py",  # 身份校验（GatewayMiddleware）可能返回401相关的错误
     }
     
     violations = []
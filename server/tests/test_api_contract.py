@@ -7,7 +7,7 @@
 import pytest
 from fastapi.testclient import TestClient
 
-from app.api.contract import compute_payload_hash
+from app.api.contract import compute_payload_digest, compute_payload_hash, format_rfc3339_utc
 from main import app
 
 client = TestClient(app)
@@ -45,6 +45,18 @@ def test_invalid_device_id_format():
     assert data["error"]["code"] == "INVALID_REQUEST"
 
 
+@pytest.mark.parametrize("device_id", [
+    TEST_DEVICE_ID.upper(),                      # 大写
+    TEST_DEVICE_ID + "0",                        # 长度37
+    "550e8400-e29b-11d4-a716-446655440000",      # v1
+    "550e8400-e29b-41d4-c716-446655440000",      # variant非RFC 4122
+])
+def test_non_canonical_uuid_v4_device_id(device_id):
+    """PATCH-1: 仅接受小写规范UUID v4 → 其他一律400"""
+    response = client.post("/v1/uploads", json={}, headers={"X-Device-Id": device_id})
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == "INVALID_REQUEST"
+
 def test_health_exempt_device_id():
     """GATE-8: /health豁免X-Device-Id"""
     response = client.get("/v1/health")
@@ -197,6 +209,39 @@ def test_canonical_hash_parity():
     assert hash1 != hash2
 
 
+def test_canonical_digest_matches_hash():
+    """PATCH-7: 原始digest与hex hash是同一canonical SHA-256（键序无关）"""
+    payload = {"chunk_count": 20, "bundle_hash": "abc123", "名称": "值"}
+    digest = compute_payload_digest(payload)
+    assert len(digest) == 32
+    assert digest.hex() == compute_payload_hash(payload)
+    assert digest == compute_payload_digest(dict(reversed(list(payload.items()))))
+
+
+# MARK: - Response Envelope Serialization Test
+
+def test_render_success_envelope_matches_json_response():
+    """成功信封bytes与JSONResponse(model_dump(exclude_none=True))逐字节一致"""
+    from fastapi.responses import JSONResponse
+    from app.api.contract import APIResponse, render_success_envelope
+
+    data = {"jobs": [{"job_id": "j1", "artifact_id": None}], "total": 1, "message": "进度 é", "pct": 12.5}
+    expected = JSONResponse(content=APIResponse(success=True, data=data).model_dump(exclude_none=True)).body
+    assert render_success_envelope(data) == expected
+
+
+def test_job_list_items_adapter_matches_validated_dump():
+    """JOB_LIST_ITEMS_ADAPTER序列化model_construct行，与逐行校验+model_dump结果一致（保留null）"""
+    from app.api.contract import JOB_LIST_ITEMS_ADAPTER, JobListItem
+
+    rows = [
+        {"job_id": "j1", "state": "queued", "created_at": "2026-01-01T00:00:00Z", "artifact_id": None},
+        {"job_id": "j2", "state": "completed", "created_at": "2026-01-02T00:00:00Z", "artifact_id": "a1"},
+    ]
+    expected = [JobListItem(**r).model_dump() for r in rows]
+    assert JOB_LIST_ITEMS_ADAPTER.dump_python([JobListItem.model_construct(**r) for r in rows]) == expected
+
+
 # MARK: - PATCH-8: Request Size Enforcement Test
 
 def test_header_size_limit_400():
@@ -222,6 +267,20 @@ def test_json_body_size_limit_413():
     assert data["error"]["code"] == "PAYLOAD_TOO_LARGE"
 
 
+def test_streamed_json_body_size_limit_413():
+    """PATCH-8: 无Content-Length的chunked JSON body超限 → 413（边读边计数）"""
+    headers = get_headers()
+    
+    def body():
+        for _ in range(80):
+            yield b"x" * 1024  # 80KB total, no Content-Length
+    
+    response = client.post("/v1/uploads", content=body(), headers=headers)
+    assert response.status_code == 413
+    data = response.json()
+    assert data["error"]["code"] == "PAYLOAD_TOO_LARGE"
+
+
 # MARK: - GATE-2: 405→404 Test
 
 def test_method_not_allowed_404():
@@ -289,6 +348,20 @@ def test_camera_only_enforcement():
     assert "aether_camera" in data["error"]["message"]
 
 
+# MARK: - GATE-4: Timestamp Format Test
+
+def test_format_rfc3339_utc():
+    """GATE-4: YYYY-MM-DDTHH:MM:SSZ，无微秒；与strftime输出一致"""
+    from datetime import datetime, timezone
+    for dt in (
+        datetime(2026, 1, 2, 3, 4, 5, 678901),
+        datetime(2026, 1, 2, 3, 4, 5),
+        datetime(2026, 1, 2, 3, 4, 5, 1, tzinfo=timezone.utc),
+    ):
+        expected = dt.replace(microsecond=0).strftime("%Y-%m-%dT%H:%M:%SZ")
+        assert format_rfc3339_utc(dt) == expected == "2026-01-02T03:04:05Z"
+
+
 # MARK: - Endpoint Count Test
 
 def test_endpoint_count():
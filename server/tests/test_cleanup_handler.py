@@ -14,8 +14,8 @@ from pathlib import Path
 from unittest.mock import Mock, patch
 
 from app.services.cleanup_handler import (
-    CleanupHandler, CleanupResult, cleanup_after_assembly,
-    cleanup_global, cleanup_user_expired
+    FAST_RMTREE_MIN_ENTRIES, CleanupHandler, CleanupResult, _fast_rmtree, _rmtree_reporting,
+    cleanup_after_assembly, cleanup_global, cleanup_user_expired
 )
 from app.models import UploadSession
 
@@ -78,10 +78,12 @@ class TestCleanupAfterAssembly:
         chunk_file = chunk_dir / "000000.chunk"
         chunk_file.write_bytes(b"test")
         
-        # Simulate file deletion failure
-        with patch('pathlib.Path.unlink', side_effect=OSError("Permission denied")):
+        # Simulate file deletion failure (rmtree unlinks through os.unlink)
+        with patch('os.unlink', side_effect=OSError("Permission denied")):
             result = cleanup_after_assembly(upload_id, success=True)
             assert len(result.errors) > 0  # Errors logged but continues
+        assert result.chunks_deleted == 0
+        assert chunk_file.exists()
     
     def test_cleanup_after_assembly_assembly_dir(self, mock_settings, upload_id):
         """Assembly directory is cleaned."""
@@ -236,3 +238,63 @@ class TestCleanupResult:
         d = result.to_dict()
         assert d["chunks_deleted"] == 5
         assert "error_count" in d
+
+
+# Test _fast_rmtree()
+class TestFastRmtree:
+    """Test _fast_rmtree() native rm -rf path for large trees."""
+    
+    def _make_tree(self, root: Path, count: int) -> Path:
+        chunk_dir = root / "orphan" / "chunks"
+        chunk_dir.mkdir(parents=True)
+        for i in range(count):
+            (chunk_dir / f"{i:06d}.chunk").write_bytes(b"x")
+        return root / "orphan"
+    
+    @pytest.mark.skipif(shutil.which("rm") is None, reason="no rm binary")
+    def test_fast_rmtree_large_tree_uses_rm(self, mock_settings, temp_upload_dir):
+        """Trees at/over the threshold are removed by one rm -rf subprocess."""
+        mock_settings.cleanup_native_rm = True
+        tree = self._make_tree(temp_upload_dir, FAST_RMTREE_MIN_ENTRIES)
+        with patch('app.services.cleanup_handler.subprocess.run', wraps=__import__("subprocess").run) as run:
+            _fast_rmtree(tree)
+        assert run.call_count == 1
+        assert not tree.exists()
+    
+    def test_fast_rmtree_small_tree_or_disabled_uses_shutil(self, mock_settings, temp_upload_dir):
+        """Small trees, or cleanup_native_rm=False, never spawn a subprocess."""
+        mock_settings.cleanup_native_rm = False
+        tree = self._make_tree(temp_upload_dir, FAST_RMTREE_MIN_ENTRIES)
+        with patch('app.services.cleanup_handler.subprocess.run') as run:
+            _fast_rmtree(tree)
+        run.assert_not_called()
+        assert not tree.exists()
+    
+    def test_fast_rmtree_rm_failure_raises_oserror(self, mock_settings, temp_upload_dir):
+        """A failing rm surfaces as OSError (callers' INV-U25 handlers catch it)."""
+        mock_settings.cleanup_native_rm = True
+        tree = self._make_tree(temp_upload_dir, FAST_RMTREE_MIN_ENTRIES)
+        with patch('app.services.cleanup_handler.shutil.which', return_value=shutil.which("false") or "/bin/false"):
+            with pytest.raises(OSError):
+                _fast_rmtree(tree)
+
+
+# Test _rmtree_reporting()
+class TestRmtreeReporting:
+    """Test _rmtree_reporting() picks onexc/onerror by Python version."""
+    
+    @pytest.mark.parametrize("version,keyword", [((3, 11), "onerror"), ((3, 12), "onexc")])
+    def test_rmtree_reporting_keyword(self, version, keyword):
+        """3.12+ passes onexc (no DeprecationWarning); 3.11 passes onerror."""
+        on_exc = Mock()
+        error = PermissionError("denied")
+        with patch('app.services.cleanup_handler.sys') as mock_sys, \
+             patch('app.services.cleanup_handler.shutil.rmtree') as rmtree:
+            mock_sys.version_info = version
+            _rmtree_reporting("/tmp/x", on_exc)
+            (path_str,), kwargs = rmtree.call_args
+            assert path_str == "/tmp/x" and list(kwargs) == [keyword]
+            # Both adapters hand on_exc the exception instance
+            arg = (type(error), error, None) if keyword == "onerror" else error
+            kwargs[keyword](os.unlink, "/tmp/x/a.chunk", arg)
+        on_exc.assert_called_once_with(os.unlink, "/tmp/x/a.chunk", error)
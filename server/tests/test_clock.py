@@ -0,0 +1,42 @@
+"""
+Tests for app.core.clock.now_utc().
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.core import clock
+from app.core.clock import CLOCK_RESYNC_SECONDS, now_utc
+
+
+def _reset_anchor():
+    clock._Clock._anchor = (float("-inf"), datetime.min)
+
+
+def test_now_utc_close_to_utcnow():
+    """now_utc() stays within the resync window of datetime.utcnow()."""
+    _reset_anchor()
+    delta = abs(now_utc() - datetime.utcnow())
+    assert delta < timedelta(seconds=CLOCK_RESYNC_SECONDS * 2)
+
+
+def test_now_utc_derives_from_monotonic_inside_window():
+    """Inside the window the wall clock is not re-read."""
+    _reset_anchor()
+    with patch("app.core.clock.time.monotonic", side_effect=[100.0, 100.05]):
+        first = now_utc()
+        with patch("app.core.clock.datetime") as mock_datetime:
+            second = now_utc()
+    mock_datetime.utcnow.assert_not_called()
+    assert second - first == timedelta(seconds=0.05)
+
+
+def test_now_utc_resyncs_after_window():
+    """Past the window the anchor is refreshed from datetime.utcnow()."""
+    _reset_anchor()
+    wall = datetime(2030, 1, 1)
+    with patch("app.core.clock.time.monotonic", side_effect=[100.0, 100.0 + CLOCK_RESYNC_SECONDS * 2]):
+        now_utc()
+        with patch("app.core.clock.datetime") as mock_datetime:
+            mock_datetime.utcnow.return_value = wall
+            assert now_utc() == wall
@@ -0,0 +1,36 @@
+"""请求头缓存中间件测试"""
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.middleware.header_cache import HeaderCacheMiddleware, cached_header
+
+
+def _make_app(with_cache: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/echo")
+    async def echo(request: Request):
+        return {
+            "device_id": cached_header(request, b"x-device-id"),
+            "idempotency_key": cached_header(request, b"x-idempotency-key", "none"),
+            "cached": "hdr" in request.scope.get("state", {}),
+        }
+
+    if with_cache:
+        app.add_middleware(HeaderCacheMiddleware)
+    return app
+
+
+def test_header_cache_populates_state():
+    """挂载后：一次扫描写入request.state.hdr，缺失header返回默认值"""
+    client = TestClient(_make_app(with_cache=True))
+    data = client.get("/echo", headers={"X-Device-Id": "dev-1"}).json()
+    assert data == {"device_id": "dev-1", "idempotency_key": "none", "cached": True}
+
+
+def test_cached_header_falls_back_without_middleware():
+    """未挂载时：回退到request.headers"""
+    client = TestClient(_make_app(with_cache=False))
+    data = client.get("/echo", headers={"X-Idempotency-Key": "k1"}).json()
+    assert data == {"device_id": "", "idempotency_key": "k1", "cached": False}
@@ -224,3 +224,56 @@ def test_idempotency_different_method():
     # PATCH请求（如果支持幂等性）
     # 注意：当前PATCH端点（upload_chunk）不使用JSON body中的idempotency_key
     # 这个测试主要验证概念：不同method使用相同key不会冲突
+
+
+def test_idempotency_cache_lru_bound():
+    """缓存有上限：超出max_entries时淘汰最久未使用的key"""
+    import time
+    from app.middleware.idempotency import _IdempotencyCache
+    
+    cache = _IdempotencyCache(max_entries=2, ttl_seconds=60)
+    now = time.time()
+    cache["a"] = (b"h", b"{}", 201, now)
+    cache["b"] = (b"h", b"{}", 201, now)
+    assert cache.get("a") is not None  # a变为最近使用
+    cache["c"] = (b"h", b"{}", 201, now)
+    assert len(cache) == 2
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+
+
+def test_idempotency_cache_ttl_expiry():
+    """过期条目（超过IDEMPOTENCY_KEY_TTL）视为未命中并被移除"""
+    import time
+    from app.middleware.idempotency import _IdempotencyCache
+    
+    cache = _IdempotencyCache(max_entries=10, ttl_seconds=60)
+    cache["old"] = (b"h", b"{}", 201, time.time() - 61)
+    cache["fresh"] = (b"h", b"{}", 201, time.time())
+    assert cache.get("old") is None
+    assert len(cache) == 1
+    assert "fresh" in cache
+
+
+def test_idempotency_store_factory():
+    """后端按settings选择：memory可用，未知后端直接报错"""
+    import asyncio
+    import pytest
+    from app.middleware.idempotency import (
+        InMemoryIdempotencyStore,
+        create_idempotency_store,
+    )
+    
+    store = create_idempotency_store("memory")
+    assert isinstance(store, InMemoryIdempotencyStore)
+    
+    async def roundtrip():
+        await store.set("u:POST:/p:k-factory", b"d" * 32, b'{"ok":1}', 201)
+        # first writer wins
+        await store.set("u:POST:/p:k-factory", b"x" * 32, b"{}", 200)
+        return await store.get("u:POST:/p:k-factory")
+    
+    assert asyncio.run(roundtrip()) == (b"d" * 32, b'{"ok":1}', 201)
+    
+    with pytest.raises(ValueError):
+        create_idempotency_store("memcached")
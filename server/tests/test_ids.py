@@ -0,0 +1,28 @@
+"""
+Tests for app.core.ids.fast_uuid().
+"""
+
+import uuid
+from unittest.mock import patch
+
+from app.core import ids
+from app.core.ids import UUID_BATCH_SIZE, fast_uuid
+
+
+def test_fast_uuid_is_canonical_v4():
+    """Every id parses as RFC 4122 v4 and round-trips to the same string."""
+    for _ in range(UUID_BATCH_SIZE + 1):
+        value = fast_uuid()
+        parsed = uuid.UUID(value)
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
+        assert str(parsed) == value
+
+
+def test_fast_uuid_one_urandom_read_per_batch():
+    """os.urandom() is read once per UUID_BATCH_SIZE ids, and ids are unique."""
+    ids._reset_after_fork()
+    with patch("app.core.ids.os.urandom", wraps=ids.os.urandom) as urandom:
+        values = {fast_uuid() for _ in range(UUID_BATCH_SIZE * 2)}
+    assert urandom.call_count == 2
+    assert len(values) == UUID_BATCH_SIZE * 2
@@ -0,0 +1,90 @@
+"""
+JobRepository Tests.
+
+Tests for job_repo.py: create_no_refresh() and create_many() write paths.
+"""
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Job
+from app.repositories.job_repo import JobRepository
+
+
+@pytest.fixture
+def engine():
+    """In-memory SQLite engine with all tables."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    """SQLAlchemy session bound to the in-memory engine."""
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _job(job_id: str) -> Job:
+    return Job(id=job_id, user_id="d1", bundle_hash="a" * 64, state="queued")
+
+
+# Test create_no_refresh()
+class TestCreateNoRefresh:
+    """Test create_no_refresh() persists without the refresh SELECT."""
+
+    def test_create_no_refresh_persists_row(self, engine, db):
+        """The committed row is visible from a fresh session."""
+        JobRepository(db).create_no_refresh(_job("j1"))
+
+        with sessionmaker(bind=engine)() as other:
+            job = other.get(Job, "j1")
+            assert job is not None
+            assert (job.user_id, job.state) == ("d1", "queued")
+
+    def test_create_no_refresh_skips_select(self, engine, db):
+        """Only the INSERT reaches the database (no post-commit refresh)."""
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        JobRepository(db).create_no_refresh(_job("j1"))
+
+        assert [s.split()[0] for s in statements] == ["INSERT"]
+
+
+# Test create_many()
+class TestCreateMany:
+    """Test create_many() writes a batch in one transaction."""
+
+    def test_create_many_single_transaction(self, engine, db):
+        """5 jobs → one INSERT statement and one COMMIT."""
+        statements = []
+        commits = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        event.listen(engine, "commit", lambda conn: commits.append(conn))
+
+        jobs = JobRepository(db).create_many([_job(f"j{i}") for i in range(5)])
+
+        assert [s.split()[0] for s in statements] == ["INSERT"]
+        assert len(commits) == 1
+        assert len(jobs) == 5
+        with sessionmaker(bind=engine)() as other:
+            assert other.query(Job).count() == 5
+
+    def test_create_many_is_all_or_nothing(self, engine, db):
+        """A duplicate id in the batch rolls back every row."""
+        from sqlalchemy.exc import IntegrityError
+
+        db.add(_job("j2"))
+        db.commit()
+
+        with pytest.raises(IntegrityError):
+            JobRepository(db).create_many([_job("j1"), _job("j2"), _job("j3")])
+        db.rollback()
+
+        assert db.query(Job.id).all() == [("j2",)]
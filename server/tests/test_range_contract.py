@@ -72,6 +72,15 @@ def test_range_parser_invalid_format():
         parse_single_range("bytes=abc-def", 1000)
 
 
+def test_range_parser_rejects_non_ascii_digits_and_signs():
+    """
+    PR1E: 只接受ASCII数字（int()会接受的"+1"、" 1"、"٣"一律拒绝）
+    """
+    for header in ("bytes=+1-3", "bytes= 1-3", "bytes=\u0663-5", "bytes=1--3"):
+        with pytest.raises(RangeParseError):
+            parse_single_range(header, 1000)
+
+
 def test_range_parser_out_of_range():
     """
     PR1E: Range超出文件大小 → 拒绝
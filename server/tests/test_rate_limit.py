@@ -0,0 +1,103 @@
+# PR#3 — API Contract v2.0
+# Stage: WHITEBOX | Camera-only
+# Endpoints: 12 | HTTP Codes: 10 (3 success + 7 error) | Business Errors: 7
+
+"""限流中间件测试（令牌桶，PATCH-1）"""
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.contract_constants import APIContractConstants
+from app.middleware.gateway import GatewayMiddleware
+from app.middleware.rate_limit import match_endpoint_key
+
+TEST_DEVICE_ID = "550e8400-e29b-41d4-a716-446655440000"
+
+
+def _make_client() -> TestClient:
+    """最小应用：只挂GatewayMiddleware（身份校验 + 限流）"""
+    app = FastAPI()
+
+    @app.post("/v1/jobs")
+    async def create_job():
+        return {"ok": True}
+
+    @app.api_route("/v1/{path:path}", methods=["GET", "POST", "PATCH", "DELETE"])
+    async def endpoint_key(request: Request):
+        return {"endpoint_key": request.state.endpoint_key}
+
+    app.add_middleware(GatewayMiddleware)
+
+    return TestClient(app)
+
+
+def test_rate_limit_burst_then_429():
+    """桶满时允许limit次突发，第limit+1次 → 429 RATE_LIMITED"""
+    client = _make_client()
+    limit = APIContractConstants.RATE_LIMIT_JOBS_PER_MINUTE
+    headers = {"X-Device-Id": TEST_DEVICE_ID}
+
+    for _ in range(limit):
+        assert client.post("/v1/jobs", headers=headers).status_code == 200
+
+    response = client.post("/v1/jobs", headers=headers)
+    assert response.status_code == 429
+    assert response.json()["error"]["code"] == "RATE_LIMITED"
+    assert response.headers["X-RateLimit-Limit"] == str(limit)
+    assert response.headers["X-RateLimit-Remaining"] == "0"
+
+
+def test_rate_limit_buckets_are_per_device():
+    """不同device_id互不影响"""
+    client = _make_client()
+    limit = APIContractConstants.RATE_LIMIT_JOBS_PER_MINUTE
+
+    for _ in range(limit + 1):
+        client.post("/v1/jobs", headers={"X-Device-Id": TEST_DEVICE_ID})
+
+    other = {"X-Device-Id": "660e8400-e29b-41d4-a716-446655440000"}
+    assert client.post("/v1/jobs", headers=other).status_code == 200
+
+
+@pytest.mark.parametrize("method,path,expected", [
+    ("POST", "/v1/uploads", "POST /v1/uploads"),
+    ("PATCH", "/v1/uploads/u1/chunks", "PATCH /v1/uploads"),
+    ("POST", "/v1/jobs", "POST /v1/jobs"),
+    ("POST", "/v1/jobs/j1/cancel", "POST /v1/jobs/cancel"),
+    ("GET", "/v1/jobs/j1", "GET /v1/jobs"),
+    ("GET", "/v1/artifacts/a1/download", "GET /v1/artifacts"),
+    ("GET", "/v1/health", None),
+    ("DELETE", "/v1/jobs/j1", None),
+])
+def test_endpoint_key_lookup(method, path, expected):
+    """端点匹配查表结果"""
+    assert match_endpoint_key(method, path) == expected
+
+
+def test_gateway_caches_endpoint_key():
+    """GatewayMiddleware把匹配结果缓存到request.state.endpoint_key"""
+    client = _make_client()
+    response = client.patch("/v1/uploads/u1/chunks", headers={"X-Device-Id": TEST_DEVICE_ID})
+    assert response.json() == {"endpoint_key": "PATCH /v1/uploads"}
+
+
+def test_gateway_rate_limit_and_request_id():
+    """主应用（GatewayMiddleware）：限流生效，429与身份400均带X-Request-Id"""
+    from main import app
+
+    client = TestClient(app)
+    limit = APIContractConstants.RATE_LIMIT_JOBS_PER_MINUTE
+    headers = {"X-Device-Id": TEST_DEVICE_ID}
+
+    for _ in range(limit):
+        assert client.post("/v1/jobs", json={}, headers=headers).status_code != 429
+
+    response = client.post("/v1/jobs", json={}, headers=headers)
+    assert response.status_code == 429
+    assert response.json()["error"]["code"] == "RATE_LIMITED"
+    assert response.headers["X-Request-Id"].startswith("req_")
+
+    response = client.post("/v1/jobs", json={}, headers={"X-Device-Id": "bad"})
+    assert response.status_code == 400
+    assert response.headers["X-Request-Id"].startswith("req_")
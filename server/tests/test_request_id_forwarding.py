@@ -38,6 +38,14 @@ def test_request_id_valid_forwarded():
     assert response.headers["X-Request-Id"] == valid_request_id
 
 
+def test_request_id_length_boundaries_forwarded():
+    """
+    PR1E: 恰好8字符 / 恰好64字符 → 回传相同值
+    """
+    for request_id in ("a" * 8, "b" * 64):
+        response = client.get("/v1/health", headers=get_headers(request_id=request_id))
+        assert response.headers["X-Request-Id"] == request_id
+
 def test_request_id_invalid_generated():
     """
     PR1E: 无效X-Request-Id → 生成新值
@@ -75,6 +83,17 @@ def test_request_id_missing_generated():
     assert response.headers["X-Request-Id"].startswith("req_")
 
 
+def test_generated_request_ids_unique_and_valid():
+    """
+    PR1E: 服务端生成的ID（前缀+计数器）互不相同且满足格式
+    """
+    from app.middleware.request_id import generate_request_id
+    
+    ids = [generate_request_id() for _ in range(1000)]
+    assert len(set(ids)) == len(ids)
+    assert all(REQUEST_ID_PATTERN.match(rid) for rid in ids)
+    assert all(rid.startswith("req_") for rid in ids)
+
 def test_request_id_in_error_response():
     """
     PR1E: 错误响应也包含X-Request-Id
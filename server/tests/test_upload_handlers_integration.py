@@ -6,6 +6,7 @@ complete_upload with full pipeline integration.
 """
 
 import hashlib
+import os
 import pytest
 import tempfile
 import shutil
@@ -341,6 +342,337 @@ class TestCompleteUpload:
         pass  # Requires DB inspection
 
 
+# Test chunk UPSERT on uq_upload_chunk_index
+class TestChunkUpsert:
+    """Test _chunk_upsert_statement() idempotency (single round trip)."""
+    
+    @pytest.fixture
+    def db(self):
+        from datetime import datetime, timedelta
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+        
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        session.add(UploadSession(
+            id="u1", user_id="d1", capture_source="aether_camera", capture_session_id="c1",
+            bundle_hash="a" * 64, bundle_size=1, chunk_count=1,
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        ))
+        session.commit()
+        yield session
+        session.close()
+    
+    def test_upsert_inserts_new_chunk(self, db):
+        """First upload of an index returns the freshly inserted row."""
+        from app.api.handlers.upload_handlers import _chunk_upsert_statement
+        row = db.execute(_chunk_upsert_statement(db, "id-1", "u1", 0, "b" * 64)).one()
+        assert row.id == "id-1"
+        assert row.chunk_hash == "b" * 64
+    
+    def test_upsert_conflict_returns_existing_row(self, db):
+        """Re-upload of an index keeps and returns the stored row untouched."""
+        from app.api.handlers.upload_handlers import _chunk_upsert_statement
+        db.execute(_chunk_upsert_statement(db, "id-1", "u1", 0, "b" * 64))
+        db.commit()
+        row = db.execute(_chunk_upsert_statement(db, "id-2", "u1", 0, "c" * 64)).one()
+        assert row.id == "id-1"
+        assert row.chunk_hash == "b" * 64
+        assert db.query(Chunk).count() == 1
+
+
+
+# Test upload_chunk() end to end against a file-backed SQLite database
+class TestUploadChunkEndToEnd:
+    """Test upload_chunk() DB/file ordering through the ASGI app."""
+    
+    CHUNK_COUNT = 8
+    
+    @pytest.fixture
+    def session_factory(self, temp_upload_dir):
+        from datetime import datetime, timedelta
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+        
+        # timeout=1: a lock held across an await fails fast instead of after 5s
+        engine = create_engine(
+            f"sqlite:///{temp_upload_dir / 'test.db'}",
+            connect_args={"check_same_thread": False, "timeout": 1},
+        )
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with factory() as session:
+            session.add(UploadSession(
+                id="u1", user_id="550e8400-e29b-41d4-a716-446655440000",
+                capture_source="aether_camera", capture_session_id="c1",
+                bundle_hash="a" * 64, bundle_size=self.CHUNK_COUNT, chunk_count=self.CHUNK_COUNT,
+                expires_at=datetime.utcnow() + timedelta(hours=1)
+            ))
+            session.commit()
+        yield factory
+        engine.dispose()
+    
+    def _send(self, session_factory, temp_upload_dir, headers, batches):
+        """PATCH each batch of (index, body) concurrently, batches in order; returns all responses."""
+        import asyncio
+        import httpx
+        from app.core.config import settings
+        
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+        
+        async def upload_all():
+            responses = []
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+                for batch in batches:
+                    responses.extend(await asyncio.gather(*(
+                        ac.patch(
+                            "/v1/uploads/u1/chunks",
+                            content=body,
+                            headers={
+                                **headers,
+                                "X-Chunk-Index": str(index),
+                                "X-Chunk-Hash": hashlib.sha256(body).hexdigest(),
+                            },
+                        )
+                        for index, body in batch
+                    )))
+            return responses
+        
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            with patch.object(settings, "upload_path", temp_upload_dir):
+                return asyncio.run(upload_all())
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+    
+    def test_concurrent_chunk_uploads_all_stored(self, session_factory, temp_upload_dir, headers):
+        """8 concurrent PATCHes all return 200 and each chunk is committed once."""
+        batch = [(i, bytes([i]) * 1024) for i in range(self.CHUNK_COUNT)]
+        responses = self._send(session_factory, temp_upload_dir, headers, [batch])
+        
+        assert [r.status_code for r in responses] == [200] * self.CHUNK_COUNT
+        assert {r.json()["data"]["chunk_status"] for r in responses} == {"stored"}
+        with session_factory() as db:
+            assert db.query(Chunk).filter(Chunk.upload_id == "u1").count() == self.CHUNK_COUNT
+        assert len(list((temp_upload_dir / "u1" / "chunks").glob("*.chunk"))) == self.CHUNK_COUNT
+    
+    def test_conflicting_reupload_keeps_stored_chunk(self, session_factory, temp_upload_dir, headers):
+        """Same index, different body → 409; the stored chunk file and row are untouched."""
+        original, other = b"a" * 1024, b"b" * 1024
+        responses = self._send(session_factory, temp_upload_dir, headers, [[(0, original)], [(0, other)]])
+        
+        assert [r.status_code for r in responses] == [200, 409]
+        chunk_dir = temp_upload_dir / "u1" / "chunks"
+        assert sorted(p.name for p in chunk_dir.iterdir()) == ["000000.chunk"]
+        assert (chunk_dir / "000000.chunk").read_bytes() == original
+        with session_factory() as db:
+            rows = db.query(Chunk.chunk_index, Chunk.chunk_hash).filter(Chunk.upload_id == "u1").all()
+        assert rows == [(0, hashlib.sha256(original).hexdigest())]
+    
+    def test_same_hash_retry_leaves_stored_file(self, session_factory, temp_upload_dir, headers):
+        """Same index, same body → already_present; the stored file is not replaced."""
+        body = b"a" * 1024
+        first = self._send(session_factory, temp_upload_dir, headers, [[(0, body)]])
+        chunk_path = temp_upload_dir / "u1" / "chunks" / "000000.chunk"
+        inode = chunk_path.stat().st_ino
+        retry = self._send(session_factory, temp_upload_dir, headers, [[(0, body)]])
+        
+        assert first[0].json()["data"]["chunk_status"] == "stored"
+        assert retry[0].status_code == 200
+        assert retry[0].json()["data"]["chunk_status"] == "already_present"
+        assert chunk_path.stat().st_ino == inode
+        assert chunk_path.read_bytes() == body
+        assert sorted(p.name for p in chunk_path.parent.iterdir()) == ["000000.chunk"]
+    
+    def test_publish_failure_removes_committed_row(self, session_factory, temp_upload_dir, headers):
+        """A failed rename after the upsert commit → 500 and no Chunk row without a file."""
+        from app.services.upload_service import AssemblyError, ChunkWriter, UploadErrorKind
+        
+        error = AssemblyError("rename failed", kind=UploadErrorKind.CHUNK_WRITE_FAILED)
+        with patch.object(ChunkWriter, "publish", side_effect=error):
+            responses = self._send(session_factory, temp_upload_dir, headers, [[(0, b"a" * 1024)]])
+        
+        assert responses[0].status_code == 500
+        with session_factory() as db:
+            assert db.query(Chunk).filter(Chunk.upload_id == "u1").count() == 0
+        assert list((temp_upload_dir / "u1" / "chunks").iterdir()) == []
+
+
+# Test _create_upload_job() (complete_upload V2-H single transaction)
+class TestCreateUploadJob:
+    """Test the ORM path and the opt-in PostgreSQL CTE path stage identical rows."""
+    
+    @staticmethod
+    def _seed(engine):
+        from datetime import datetime, timedelta
+        from sqlalchemy.orm import sessionmaker
+        from app.database import Base
+        
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(bind=engine)()
+        upload_session = UploadSession(
+            id="u1", user_id="d1", capture_source="aether_camera", capture_session_id="c1",
+            bundle_hash="a" * 64, bundle_size=1, chunk_count=1,
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        )
+        session.add(upload_session)
+        session.commit()
+        return session, upload_session
+    
+    def _assert_job_created(self, db, job_id):
+        db.commit()
+        job = db.get(Job, job_id)
+        assert (job.user_id, job.bundle_hash, job.state) == ("d1", "a" * 64, "queued")
+        assert job.created_at is not None
+        events = db.query(TimelineEvent).filter(TimelineEvent.job_id == job_id).all()
+        assert [(e.from_state, e.to_state, e.trigger) for e in events] == [(None, "queued", "job_created")]
+        db.expire_all()
+        assert db.get(UploadSession, "u1").status == "completed"
+    
+    @pytest.mark.parametrize("pg_cte", [False, True])
+    def test_orm_path_on_sqlite(self, pg_cte):
+        """SQLite always takes the ORM path, whatever complete_upload_pg_cte says."""
+        from sqlalchemy import create_engine
+        from app.api.handlers.upload_handlers import _create_upload_job
+        
+        db, upload_session = self._seed(create_engine("sqlite://"))
+        with patch("app.api.handlers.upload_handlers.settings") as mock:
+            mock.complete_upload_pg_cte = pg_cte
+            job_id = _create_upload_job(db, upload_session, "d1")
+        assert upload_session.status == "completed"
+        self._assert_job_created(db, job_id)
+        db.close()
+    
+    def test_pg_cte_binds_match_handler_params(self):
+        """The CTE compiles on the PostgreSQL dialect and gets exactly its bind params."""
+        from sqlalchemy import inspect
+        from sqlalchemy.dialects import postgresql
+        from app.api.handlers.upload_handlers import _COMPLETE_UPLOAD_CTE, _create_upload_job
+        
+        compiled = _COMPLETE_UPLOAD_CTE.compile(dialect=postgresql.dialect())
+        assert "WITH j AS (INSERT INTO jobs" in str(compiled)
+        
+        db = Mock()
+        db.get_bind.return_value.dialect.name = "postgresql"
+        upload_session = UploadSession(id="u1", bundle_hash="a" * 64, status="in_progress")
+        with patch("app.api.handlers.upload_handlers.settings") as mock:
+            mock.complete_upload_pg_cte = True
+            job_id = _create_upload_job(db, upload_session, "d1")
+        
+        statement, params = db.execute.call_args.args
+        assert statement is _COMPLETE_UPLOAD_CTE
+        assert set(params) == set(compiled.binds)
+        assert (params["job_id"], params["user_id"], params["upload_id"]) == (job_id, "d1", "u1")
+        db.add_all.assert_not_called()
+        # The loaded instance reflects the UPDATE without queuing a redundant ORM UPDATE
+        assert upload_session.status == "completed"
+        assert not inspect(upload_session).attrs.status.history.has_changes()
+    
+    @pytest.mark.skipif(
+        not os.environ.get("AETHER3D_TEST_POSTGRES_URL"),
+        reason="set AETHER3D_TEST_POSTGRES_URL to run against PostgreSQL"
+    )
+    def test_pg_cte_on_postgresql(self):
+        """End-to-end: the CTE path writes the same rows as the ORM path."""
+        from sqlalchemy import create_engine
+        from app.api.handlers.upload_handlers import _create_upload_job
+        from app.database import Base
+        
+        engine = create_engine(os.environ["AETHER3D_TEST_POSTGRES_URL"])
+        Base.metadata.drop_all(bind=engine)
+        db, upload_session = self._seed(engine)
+        try:
+            with patch("app.api.handlers.upload_handlers.settings") as mock:
+                mock.complete_upload_pg_cte = True
+                job_id = _create_upload_job(db, upload_session, "d1")
+            assert upload_session.status == "completed"
+            assert upload_session not in db.dirty
+            self._assert_job_created(db, job_id)
+        finally:
+            db.close()
+            Base.metadata.drop_all(bind=engine)
+            engine.dispose()
+
+
+# Test prebuilt static error payloads
+class TestStaticErrors:
+    """Test _prebuild_error() output matches the per-request error envelope."""
+    
+    def test_prebuilt_error_byte_identical(self):
+        """Prebuilt body equals JSONResponse(APIResponse(...).model_dump(exclude_none=True))."""
+        from fastapi.responses import JSONResponse
+        from app.api.contract import APIError, APIErrorCode, APIResponse
+        from app.api.handlers.upload_handlers import _ERR_CHUNK_HASH_MISMATCH, _static_error_response
+        
+        expected = JSONResponse(
+            status_code=400,
+            content=APIResponse(
+                success=False,
+                error=APIError(code=APIErrorCode.INVALID_REQUEST, message="Chunk hash mismatch")
+            ).model_dump(exclude_none=True)
+        )
+        response = _static_error_response(_ERR_CHUNK_HASH_MISMATCH)
+        assert response.status_code == expected.status_code
+        assert response.body == expected.body
+        assert response.headers["content-type"] == expected.headers["content-type"]
+    
+    def test_json_response_matches_json_response(self):
+        """pydantic-core serialization equals JSONResponse for a get_chunks payload."""
+        from fastapi.responses import JSONResponse
+        from app.api.contract import APIResponse, GetChunksResponse
+        from app.api.handlers.upload_handlers import _json_response
+        
+        api_response = APIResponse(success=True, data=GetChunksResponse(
+            upload_id="u1",
+            received_chunks=list(range(150)),
+            missing_chunks=list(range(150, 200)),
+            total_chunks=200,
+            status="in_progress",
+            expires_at="2030-01-01T00:00:00Z"
+        ).model_dump())
+        expected = JSONResponse(status_code=200, content=api_response.model_dump(exclude_none=True))
+        assert _json_response(api_response, 200).body == expected.body
+
+
+class TestEarlyRejection:
+    """Test upload_chunk() rejects bad headers without consuming the body."""
+    
+    @pytest.mark.parametrize("extra_headers,message", [
+        ({}, "Missing X-Chunk-Index"),
+        ({"X-Chunk-Index": "0"}, "Missing X-Chunk-Hash"),
+        ({"X-Chunk-Index": "x", "X-Chunk-Hash": "a" * 64}, "Invalid X-Chunk-Index"),
+        ({"X-Chunk-Index": "2", "X-Chunk-Hash": "a" * 64}, "Chunk index out of range"),
+        ({"X-Chunk-Index": "0", "X-Chunk-Hash": "zz"}, "Invalid X-Chunk-Hash format"),
+    ])
+    def test_bad_headers_never_touch_body(self, extra_headers, message):
+        """Header/range failures return 400 before request.stream() or disk access."""
+        import asyncio
+        import json
+        from unittest.mock import Mock, patch
+        from app.api.handlers.upload_handlers import upload_chunk
+        
+        request = Mock()
+        request.headers = {"Content-Length": "100", **extra_headers}
+        request.stream.side_effect = AssertionError("body consumed")
+        with patch("app.api.handlers.upload_handlers.check_disk_quota") as quota:
+            response = asyncio.run(upload_chunk(
+                "u1", request, db=Mock(), upload_session=Mock(chunk_count=2)
+            ))
+        assert response.status_code == 400
+        assert json.loads(response.body)["error"]["message"] == message
+        request.stream.assert_not_called()
+        quota.assert_not_called()
+
+
 # Test error code coverage
 class TestErrorCodes:
     """Test all error codes are from closed set."""
@@ -6,6 +6,7 @@ _durable_fsync, check_disk_quota, validate_path_component, validate_hash_compone
 _assert_within_upload_dir, AssemblyState transitions, AssemblyResult dataclass.
 """
 
+import asyncio
 import hashlib
 import os
 import pytest
@@ -16,9 +17,10 @@ from pathlib import Path
 from unittest.mock import Mock, patch
 
 from app.services.upload_service import (
-    AssemblyError, AssemblyResult, AssemblyState, UploadErrorKind,
-    _assert_within_upload_dir, _durable_fsync, assemble_bundle, check_disk_quota,
-    persist_chunk, validate_hash_component, validate_path_component, verify_assembly
+    AssemblyError, AssemblyResult, AssemblyState, ChunkWriter, UploadErrorKind,
+    _assert_within_upload_dir, _durable_fsync, assemble_bundle, check_disk_quota, new_sha256,
+    persist_chunk, sha256_backend_info, validate_hash_component, validate_path_component,
+    verify_assembly
 )
 from app.services.upload_contract_constants import UploadContractConstants
 from app.models import Chunk, UploadSession
@@ -129,6 +131,71 @@ class TestPersistChunk:
         # After persist: only final file exists
         assert final_path.exists()
         assert not tmp_path.exists()  # Temp file removed
+    
+    def test_persist_chunk_short_writes_retried(self, mock_settings, upload_id, sample_chunk_data, sample_chunk_hash):
+        """Short os.write() results are looped until the whole chunk is written."""
+        real_write = os.write
+        
+        def short_write(fd, data):
+            return real_write(fd, bytes(data[:100]))
+        
+        with patch('app.services.upload_service.os.write', side_effect=short_write):
+            chunk_path = persist_chunk(upload_id, 0, sample_chunk_data, sample_chunk_hash)
+        assert chunk_path.read_bytes() == sample_chunk_data
+
+
+# Test ChunkWriter
+class TestChunkWriter:
+    """Test ChunkWriter fused hash + write streaming."""
+    
+    def test_chunk_writer_streams_and_hashes(self, mock_settings, upload_id, sample_chunk_data, sample_chunk_hash):
+        """Batches are hashed while written; commit() publishes the final chunk."""
+        writer = ChunkWriter(upload_id, 0, len(sample_chunk_data), hasher=new_sha256())
+        view = memoryview(sample_chunk_data)
+        writer.write(view[:4096])
+        writer.write(view[4096:])
+        assert writer.hasher.hexdigest() == sample_chunk_hash
+        chunk_path = writer.commit()
+        assert chunk_path.read_bytes() == sample_chunk_data
+        assert list(chunk_path.parent.glob("*.tmp")) == []
+    
+    def test_chunk_writer_abort_discards_tmp(self, mock_settings, upload_id, sample_chunk_data):
+        """abort() removes the .tmp and leaves no final chunk."""
+        writer = ChunkWriter(upload_id, 0, len(sample_chunk_data))
+        writer.write(sample_chunk_data[:100])
+        writer.abort()
+        writer.abort()  # Idempotent
+        chunk_dir = mock_settings.upload_path / upload_id / "chunks"
+        assert list(chunk_dir.iterdir()) == []
+    
+    def test_chunk_writer_short_stream_rejected(self, mock_settings, upload_id, sample_chunk_data):
+        """commit() refuses a chunk shorter than its declared size."""
+        writer = ChunkWriter(upload_id, 0, len(sample_chunk_data))
+        writer.write(sample_chunk_data[:-1])
+        with pytest.raises(AssemblyError) as exc_info:
+            writer.commit()
+        assert exc_info.value.kind == UploadErrorKind.CHUNK_WRITE_FAILED
+        assert not (mock_settings.upload_path / upload_id / "chunks" / "000000.chunk").exists()
+    
+    def test_chunk_writer_async_runs_on_chunk_io_pool(self, mock_settings, upload_id, sample_chunk_data):
+        """The *_async methods do their write + fsync on a chunkio worker thread."""
+        import threading
+        seen_threads = []
+        
+        def recording_fsync(fd):
+            seen_threads.append(threading.current_thread().name)
+            _durable_fsync(fd)
+        
+        async def stream():
+            writer = await ChunkWriter.open_async(upload_id, 0, len(sample_chunk_data))
+            await writer.write_async(sample_chunk_data)
+            await writer.sync_async()
+            return await writer.publish_async()
+        
+        with patch('app.services.upload_service._durable_fsync', side_effect=recording_fsync):
+            chunk_path = asyncio.run(stream())
+        assert chunk_path.read_bytes() == sample_chunk_data
+        assert seen_threads and all(name.startswith("chunkio") for name in seen_threads)
 
 
 # Test assemble_bundle()
@@ -157,6 +224,52 @@ class TestAssembleBundle:
         assert result.bundle_path.exists()
         assert len(result.chunk_hashes) == 1
     
+    def test_assemble_bundle_multi_chunk_content(self, mock_settings, mock_db, mock_session, upload_id):
+        """Bundle bytes and hash equal the in-order concatenation of chunks."""
+        chunk_dir = mock_settings.upload_path / upload_id / "chunks"
+        chunk_dir.mkdir(parents=True)
+        parts = [b"a" * 3000, b"b" * 1, b"c" * 70000]
+        chunk_records = []
+        for i, part in enumerate(parts):
+            (chunk_dir / f"{i:06d}.chunk").write_bytes(part)
+            chunk = Mock(spec=Chunk)
+            chunk.upload_id = upload_id
+            chunk.chunk_index = i
+            chunk.chunk_hash = hashlib.sha256(part).hexdigest()
+            chunk_records.append(chunk)
+        bundle = b"".join(parts)
+        mock_session.chunk_count = len(parts)
+        mock_session.bundle_size = len(bundle)
+        mock_session.bundle_hash = hashlib.sha256(bundle).hexdigest()
+        
+        mock_db.query.return_value.filter.return_value.order_by.return_value.all.return_value = chunk_records
+        
+        result = assemble_bundle(upload_id, mock_session, mock_db)
+        
+        assert result.bundle_path.read_bytes() == bundle
+        assert result.sha256_hex == mock_session.bundle_hash
+        assert result.chunk_hashes == [hashlib.sha256(p).digest() for p in parts]
+    
+    def test_assemble_bundle_copy_fallback(self, mock_settings, mock_db, mock_session, upload_id, sample_chunk_data, sample_chunk_hash):
+        """Userspace copy is used when copy_file_range is refused (EXDEV)."""
+        import errno
+        chunk_dir = mock_settings.upload_path / upload_id / "chunks"
+        chunk_dir.mkdir(parents=True)
+        (chunk_dir / "000000.chunk").write_bytes(sample_chunk_data)
+        mock_session.bundle_hash = sample_chunk_hash
+        
+        chunk_record = Mock(spec=Chunk)
+        chunk_record.upload_id = upload_id
+        chunk_record.chunk_index = 0
+        chunk_record.chunk_hash = sample_chunk_hash
+        mock_db.query.return_value.filter.return_value.order_by.return_value.all.return_value = [chunk_record]
+        
+        with patch('app.services.upload_service.os.copy_file_range',
+                   side_effect=OSError(errno.EXDEV, "cross-device"), create=True):
+            result = assemble_bundle(upload_id, mock_session, mock_db)
+        
+        assert result.bundle_path.read_bytes() == sample_chunk_data
+    
     def test_assemble_bundle_chunk_missing(self, mock_settings, mock_db, mock_session, upload_id):
         """Missing chunk file raises AssemblyError."""
         chunk_record = Mock(spec=Chunk)
@@ -190,6 +303,31 @@ class TestAssembleBundle:
             assemble_bundle(upload_id, mock_session, mock_db)
         assert exc_info.value.kind == UploadErrorKind.SIZE_MISMATCH
     
+    @pytest.mark.parametrize("recorded_hash,ok", [
+        ("upper", True),
+        ("b" * 64, False),
+        ("not-hex", False),
+    ])
+    def test_assemble_bundle_chunk_hash_check(self, mock_settings, mock_db, mock_session, upload_id, sample_chunk_data, sample_chunk_hash, recorded_hash, ok):
+        """Per-chunk digest compare: case-insensitive; wrong or corrupt DB hash → mismatch."""
+        chunk_dir = mock_settings.upload_path / upload_id / "chunks"
+        chunk_dir.mkdir(parents=True)
+        (chunk_dir / "000000.chunk").write_bytes(sample_chunk_data)
+        
+        chunk_record = Mock(spec=Chunk)
+        chunk_record.upload_id = upload_id
+        chunk_record.chunk_index = 0
+        chunk_record.chunk_hash = sample_chunk_hash.upper() if recorded_hash == "upper" else recorded_hash
+        mock_db.query.return_value.filter.return_value.order_by.return_value.all.return_value = [chunk_record]
+        
+        if ok:
+            result = assemble_bundle(upload_id, mock_session, mock_db)
+            assert result.chunk_hashes == [bytes.fromhex(sample_chunk_hash)]
+        else:
+            with pytest.raises(AssemblyError) as exc_info:
+                assemble_bundle(upload_id, mock_session, mock_db)
+            assert exc_info.value.kind == UploadErrorKind.CHUNK_HASH_MISMATCH
+    
     def test_assemble_bundle_index_gap(self, mock_settings, mock_db, mock_session, upload_id):
         """Chunk index gap raises AssemblyError."""
         mock_session.chunk_count = 3
@@ -431,6 +569,29 @@ class TestAssemblyResult:
         assert len(result.chunk_hashes) == 1
 
 
+# Test new_sha256()
+class TestNewSha256:
+    """Test template-cloned SHA-256 hashers."""
+    
+    def test_new_sha256_matches_hashlib(self):
+        """Cloned hasher produces the same digest as hashlib.sha256()."""
+        hasher = new_sha256()
+        hasher.update(b"abc")
+        assert hasher.hexdigest() == hashlib.sha256(b"abc").hexdigest()
+    
+    def test_new_sha256_independent_instances(self):
+        """Updating one clone never leaks into the template or other clones."""
+        first = new_sha256()
+        first.update(b"payload")
+        assert new_sha256().hexdigest() == hashlib.sha256(b"").hexdigest()
+    
+    def test_sha256_backend_info_reports_hasher_module(self):
+        """Backend is the module of the hasher new_sha256() actually clones."""
+        info = sha256_backend_info()
+        assert info["backend"] == type(new_sha256()).__module__
+        assert info["cpu_sha_extensions"] in (True, False, None)
+
+
 # Hypothesis property-based tests
 try:
     from hypothesis import given, strategies as st